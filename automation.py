@@ -3,10 +3,14 @@ import pandas as pd
 from datetime import datetime, timezone
 import sys
 
-from fbref_scraper import scrape_data
-from predictor import predict_match
+import history_store
+import ledger
+import match_store
+import metrics
+import prediction_server
+import predictor
+import team_registry
 import utils_data
-import utils
 
 def run_morning_job():
     print("Starting Morning Job (Prediction)...")
@@ -16,59 +20,77 @@ def run_morning_job():
     current_date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d')
     print(f"Target Date: {current_date_str}")
 
+    output_path = utils_data.get_prediction_file_path(current_date_str)
+    metrics.start('morning')
+    try:
+        _morning_job(current_date_str, output_path)
+    finally:
+        # Stage timings, counters and peak RSS go to data/metrics/morning/<date>.json
+        metrics.finish(current_date_str)
+
+def _morning_job(current_date_str, output_path):
     # 1. Fetch Data
-    # Scraper returns (completed, upcoming)
-    _, upcoming_df = scrape_data()
-    
-    if upcoming_df.empty:
-        print("No upcoming matches found from scraper.")
-        utils_data.save_json([], utils_data.get_prediction_file_path(current_date_str))
-        return
+    # One scrape refreshes the local match store; today's fixtures come from an indexed query
+    with metrics.span('fetch'):
+        match_store.refresh()
 
     # 2. Filter for Today
-    # We need to match the date string. 
-    # The dataframe 'Date' column is Timestamp.
-    
-    # Create a mask for today's matches
-    # Use string comparison to avoid potential timezone headaches with naive timestamps
-    upcoming_df['date_str'] = upcoming_df['Date'].dt.strftime('%Y-%m-%d')
-    days_matches = upcoming_df[upcoming_df['date_str'] == current_date_str].copy()
+    with metrics.span('filter'):
+        days_matches = match_store.get_matches_on(current_date_str, completed=False)
     
     if days_matches.empty:
         print(f"No matches scheduled for today ({current_date_str}).")
-        utils_data.save_json([], utils_data.get_prediction_file_path(current_date_str))
+        with metrics.span('save'):
+            history_store.save_day('predictions', current_date_str, [], output_path)
         return
 
     print(f"Found {len(days_matches)} matches for today.")
+    metrics.incr('matches_found', len(days_matches))
     
     # 3. Generate Predictions
-    predictions = []
-    
+    # Predict the whole day in one batch so each model is called once
+    registry = team_registry.get_registry()
+    match_inputs = []
     for _, row in days_matches.iterrows():
-        home_team = utils.normalize_team_name(row['Home'])
-        away_team = utils.normalize_team_name(row['Away'])
-        match_date = row['Date']
-        
-        # Prepare match dict for predictor
-        match_input = {
-            'home_team': home_team,
-            'away_team': away_team,
-            'date': match_date
-        }
-        
-        # Predict
-        # Note: We rely on the scraper's 'xg' if available, but predictor.py mainly uses history from training_df
-        # The 'match_input' to predict_match just needs names mostly.
-        pred_result = predict_match(match_input)
-        
+        match_inputs.append({
+            'home_team': registry.canonical(row['Home']),
+            'away_team': registry.canonical(row['Away']),
+            'date': row['Date'],
+            'time': row.get('Time', 'Unknown')
+        })
+
+    # Predict on the prediction server when one is running (models already in memory),
+    # otherwise load the models up front so their cost is reported apart from predicting
+    use_server = prediction_server.server_available()
+    metrics.set_value('prediction_server', use_server)
+    if not use_server:
+        with metrics.span('artifact_load'):
+            timings = predictor.warm_up()
+            metrics.set_value('artifact_load_s', {name: round(t, 6) for name, t in timings.items()})
+
+    # Note: We rely on the scraper's 'xg' if available, but predictor.py mainly uses history from training_df
+    # The match inputs to predict_matches just need names mostly.
+    with metrics.span('predict'):
+        if use_server:
+            pred_results = prediction_server.predict_matches(match_inputs)
+        else:
+            pred_results = predictor.predict_matches(match_inputs)
+        metrics.set_value('prediction_cache', predictor.cache_stats())
+    metrics.incr('matches_predicted', len(pred_results))
+
+    predictions = []
+    for match_input, pred_result in zip(match_inputs, pred_results):
+        home_team = match_input['home_team']
+        away_team = match_input['away_team']
+
         # Feature: Generate ID
-        match_id = utils_data.generate_match_id(match_date, home_team, away_team)
-        
+        match_id = utils_data.generate_match_id(match_input['date'], home_team, away_team)
+
         # Structure the output
         match_output = {
             'id': match_id,
             'date': current_date_str,
-            'time': row.get('Time', 'Unknown'),
+            'time': match_input['time'],
             'home_team': home_team,
             'away_team': away_team,
             'prediction': pred_result
@@ -76,8 +98,8 @@ def run_morning_job():
         predictions.append(match_output)
         
     # 4. Save Predictions
-    output_path = utils_data.get_prediction_file_path(current_date_str)
-    utils_data.save_json(predictions, output_path)
+    with metrics.span('save'):
+        history_store.save_day('predictions', current_date_str, predictions, output_path)
     print("Morning job completed successfully.")
 
 def run_evening_job():
@@ -86,42 +108,68 @@ def run_evening_job():
     
     current_date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d')
     print(f"Target Date: {current_date_str}")
-    
+
+    output_path = utils_data.get_result_file_path(current_date_str)
+    metrics.start('evening')
+    try:
+        _evening_job(current_date_str, output_path)
+    finally:
+        metrics.finish(current_date_str)
+
+def _evening_job(current_date_str, output_path):
     # 1. Load Predictions
     pred_path = utils_data.get_prediction_file_path(current_date_str)
-    predictions = utils_data.load_json(pred_path)
+    with metrics.span('load'):
+        # Indexed read from the history store; the per-day file covers days saved before it existed
+        predictions = history_store.get_day('predictions', current_date_str)
+        if predictions is None:
+            predictions = utils_data.load_json(pred_path)
     
     if not predictions:
         print(f"No predictions found for {current_date_str}. Nothing to compare.")
         return
 
     # 2. Fetch Results
-    # This time we care about 'completed_df'
-    completed_df, _ = scrape_data()
+    # Refresh the store, then look up only the predicted matches by id
+    with metrics.span('fetch'):
+        match_store.refresh()
+    with metrics.span('filter'):
+        completed_df = match_store.get_matches_by_ids([pred['id'] for pred in predictions])
+        completed_df = completed_df.dropna(subset=['HomeGoals', 'AwayGoals'])
     
     if completed_df.empty:
         print("No completed matches found.")
         # Proceed anyway? If we have predictions but no completed matches, 
         # it means they haven't finished or scraper failed to find them.
     
+    # 3. Compare
+    with metrics.span('compare'):
+        comparison_results = compare_predictions(predictions, completed_df)
+    metrics.incr('matches_compared', len(comparison_results))
+    metrics.incr('results_found', sum(r['status'] != 'PENDING' for r in comparison_results))
+        
+    # 4. Update the running accuracy ledger with today's results only
+    # (before saving: a re-run replaces the results stored for today)
+    with metrics.span('ledger'):
+        ledger.update(current_date_str, comparison_results)
+
+    # 5. Save Results
+    with metrics.span('save'):
+        history_store.save_day('results', current_date_str, comparison_results, output_path)
+    print("Evening job completed successfully.")
+
+def compare_predictions(predictions, completed_df):
+    """Matches predictions with completed results by id and marks each CORRECT / INCORRECT / PENDING."""
     # Prepare lookup for completed matches
     # Key: ID -> Data
-    # We need to reconstruct IDs for completed matches to match them with predictions
     results_map = {}
-    if not completed_df.empty:
-        for _, row in completed_df.iterrows():
-            h_team = utils.normalize_team_name(row['Home'])
-            a_team = utils.normalize_team_name(row['Away'])
-            m_date = row['Date']
-            m_id = utils_data.generate_match_id(m_date, h_team, a_team)
-            
-            results_map[m_id] = {
-                'home_goals': int(row['HomeGoals']),
-                'away_goals': int(row['AwayGoals']),
-                'score': f"{int(row['HomeGoals'])}-{int(row['AwayGoals'])}"
-            }
-            
-    # 3. Compare
+    for m_id, hg, ag in zip(completed_df['match_id'], completed_df['HomeGoals'], completed_df['AwayGoals']):
+        results_map[m_id] = {
+            'home_goals': int(hg),
+            'away_goals': int(ag),
+            'score': f"{int(hg)}-{int(ag)}"
+        }
+
     comparison_results = []
     
     for pred in predictions:
@@ -160,19 +208,25 @@ def run_evening_job():
              # We just leave it as PENDING/None
              
         comparison_results.append(result_entry)
-        
-    # 4. Save Results
-    output_path = utils_data.get_result_file_path(current_date_str)
-    utils_data.save_json(comparison_results, output_path)
-    print("Evening job completed successfully.")
+
+    return comparison_results
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Automated Football Predictor")
     parser.add_argument('mode', choices=['morning', 'evening'], help="Mode of operation")
+    parser.add_argument('--engine', choices=list(predictor.ENGINE_ARTIFACTS), default=None,
+                        help="Prediction engine for this run (default: config.PREDICTION_ENGINE; "
+                             "a running prediction server keeps its own)")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Dump cProfile stats for the run (also enabled by {metrics.PROFILE_ENV}=1)")
     
     args = parser.parse_args()
+    if args.engine:
+        predictor.set_engine(args.engine)
     
-    if args.mode == 'morning':
-        run_morning_job()
-    elif args.mode == 'evening':
-        run_evening_job()
+    # Profiles are written to the working directory, not the committed data folders
+    with metrics.profile(f"{args.mode}_job.prof", enabled=args.profile or metrics.profiling_enabled()):
+        if args.mode == 'morning':
+            run_morning_job()
+        elif args.mode == 'evening':
+            run_evening_job()
@@ -0,0 +1,203 @@
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+import config
+import dixon_coles
+import features
+import predictor
+import train_model
+
+# Outcome classes used for scoring: 0 = home win, 1 = draw, 2 = away win
+HOME, DRAW, AWAY = 0, 1, 2
+
+def build_features(df, window=5):
+    """
+    Engineers the model features for a chronological match history.
+    Elo and rolling form are replayed match by match, so every row only sees
+    matches played before it; team codes only encode identity, not results.
+    """
+    df, _ = features.add_elo_ratings(df)
+    df = features.calculate_rolling_stats(df, window=window)
+
+    train_model.add_team_codes(df)
+    return df.reset_index(drop=True)
+
+def match_outcomes(home_goals, away_goals):
+    """Returns the outcome class (HOME / DRAW / AWAY) for arrays of goals."""
+    home_goals = np.asarray(home_goals)
+    away_goals = np.asarray(away_goals)
+    return np.where(home_goals > away_goals, HOME, np.where(home_goals == away_goals, DRAW, AWAY))
+
+def predicted_outcomes(probs):
+    """Picks a class per row with the same tie rules as predictor.predict_matches."""
+    ph, pdraw, pa = probs[:, HOME], probs[:, DRAW], probs[:, AWAY]
+    return np.where((pdraw >= ph) & (pdraw >= pa), DRAW, np.where(ph > pa, HOME, np.where(pa > ph, AWAY, DRAW)))
+
+def score_predictions(probs, outcomes):
+    """Accuracy, multi-class Brier score and log-loss of outcome probabilities."""
+    one_hot = np.eye(3)[outcomes]
+    p_actual = np.clip(probs[np.arange(len(outcomes)), outcomes], 1e-15, 1.0)
+    return {
+        'matches': int(len(outcomes)),
+        'accuracy': float((predicted_outcomes(probs) == outcomes).mean()),
+        'brier': float(((probs - one_hot) ** 2).sum(axis=1).mean()),
+        'log_loss': float(-np.log(p_actual).mean()),
+    }
+
+def fit_forest_engine(train_df, params):
+    """
+    Fits both forests on the training rows.
+    Returns (expected_goals, rho): a (home, away) expected-goals function and the
+    low-score correction to apply (none for the forests).
+    """
+    forest_params = dict(
+        n_estimators=params['n_estimators'],
+        max_depth=params['max_depth'],
+        min_samples_leaf=params['min_samples_leaf'],
+        random_state=42,
+        n_jobs=-1,
+    )
+    X = train_df[train_model.FEATURE_COLS]
+    model_home = RandomForestRegressor(**forest_params).fit(X, train_df['home_goals'])
+    model_away = RandomForestRegressor(**forest_params).fit(X, train_df['away_goals'])
+
+    def expected_goals(test_df):
+        X_test = test_df[train_model.FEATURE_COLS]
+        return (np.maximum(0.0, model_home.predict(X_test)),
+                np.maximum(0.0, model_away.predict(X_test)))
+    return expected_goals, 0.0
+
+def fit_dixon_coles_engine(train_df, params):
+    """Fits the Dixon-Coles model on the training rows; same return shape as fit_forest_engine."""
+    model = dixon_coles.fit(train_df, xi=config.DIXON_COLES_XI)
+    # Teams without history play as an average side (fitted attack / defence of 0)
+    fallback = (np.exp(model.intercept + model.home_advantage), np.exp(model.intercept))
+
+    def expected_goals(test_df):
+        home_xg, away_xg = model.expected_goals(test_df['home_team'], test_df['away_team'])
+        return np.where(np.isnan(home_xg), fallback[0], home_xg), np.where(np.isnan(away_xg), fallback[1], away_xg)
+    return expected_goals, model.rho
+
+# Engine name -> fit function (see predictor.ENGINE_ARTIFACTS)
+ENGINES = {
+    'forest': fit_forest_engine,
+    'dixon_coles': fit_dixon_coles_engine,
+}
+
+def walk_forward(df, retrain_every_days=7, min_train_matches=50, params=None, engine='forest'):
+    """
+    Replays completed matches in date order. The model is refit every
+    `retrain_every_days` on all matches played before the current block, and
+    each match in the block is scored before its result is revealed.
+    Returns (scored_df, probs) for the matches that were predicted.
+    """
+    fit_engine = ENGINES[engine]
+    if params is None:
+        params = train_model.load_best_params()
+
+    df = build_features(df, window=params['window'])
+    dates = df['date'].to_numpy()
+
+    if len(df) <= min_train_matches:
+        print(f"Need more than {min_train_matches} matches to backtest (have {len(df)}).")
+        return df.iloc[0:0], np.zeros((0, 3))
+
+    # First block starts on the first date with enough history before it
+    block_start = pd.Timestamp(dates[min_train_matches]).normalize()
+    last_date = pd.Timestamp(dates[-1])
+    step = pd.Timedelta(days=retrain_every_days)
+
+    scored_parts = []
+    prob_parts = []
+    n_fits = 0
+    fit_seconds = 0.0
+    while block_start <= last_date:
+        block_end = block_start + step
+        train_mask = df['date'] < block_start
+        test_mask = (df['date'] >= block_start) & (df['date'] < block_end)
+
+        if test_mask.any():
+            start = time.perf_counter()
+            expected_goals, rho = fit_engine(df[train_mask], params)
+            fit_seconds += time.perf_counter() - start
+            n_fits += 1
+
+            test_df = df[test_mask]
+            home_xg, away_xg = expected_goals(test_df)
+            ph, pdraw, pa, _ = predictor.calculate_probabilities(home_xg, away_xg, rho=rho)
+
+            scored_parts.append(test_df.assign(pred_home_goals=home_xg, pred_away_goals=away_xg))
+            prob_parts.append(np.column_stack([ph, pdraw, pa]))
+
+        block_start = block_end
+
+    print(f"Backtest fitted the {engine} engine {n_fits} times in {fit_seconds:.2f}s.")
+    return pd.concat(scored_parts, ignore_index=True), np.vstack(prob_parts)
+
+def run_backtest(retrain_every_days=7, min_train_matches=50, league_id=None, refresh=False, engines=('forest',)):
+    """
+    Loads completed matches from the match store, walks forward with each engine
+    and reports the scores. With several engines the reports are keyed by engine.
+    """
+    import match_store
+
+    completed, _ = match_store.load_fixtures(refresh_first=refresh, league_id=league_id)
+    if completed.empty:
+        print("No completed matches in the match store to backtest on.")
+        return None
+
+    df = train_model.prepare_matches(completed)
+    reports = {}
+    for engine in engines:
+        start = time.perf_counter()
+        scored, probs = walk_forward(df, retrain_every_days, min_train_matches, engine=engine)
+        if scored.empty:
+            return None
+
+        outcomes = match_outcomes(scored['home_goals'], scored['away_goals'])
+        report = score_predictions(probs, outcomes)
+        report['engine'] = engine
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        report['from'] = scored['date'].min().strftime('%Y-%m-%d')
+        report['to'] = scored['date'].max().strftime('%Y-%m-%d')
+        reports[engine] = report
+
+        print(f"Backtest of the {engine} engine over {report['matches']} matches ({report['from']} to {report['to']}):")
+        print(f"  Accuracy: {report['accuracy'] * 100:.1f}%")
+        print(f"  Brier score: {report['brier']:.4f}")
+        print(f"  Log-loss: {report['log_loss']:.4f}")
+        print(f"  Time: {report['seconds']:.2f}s")
+
+    if len(reports) == 1:
+        return reports[engines[0]]
+
+    print(f"\n{'Engine':<14}{'Accuracy':>10}{'Brier':>9}{'Log-loss':>10}{'Time':>9}")
+    for engine, report in reports.items():
+        print(f"{engine:<14}{report['accuracy'] * 100:>9.1f}%{report['brier']:>9.4f}"
+              f"{report['log_loss']:>10.4f}{report['seconds']:>8.2f}s")
+    return {'engines': reports}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the Football Predictor")
+    parser.add_argument('--retrain-every', type=int, default=7,
+                        help="Days between model refits (default: 7)")
+    parser.add_argument('--min-train', type=int, default=50,
+                        help="Matches of history required before the first prediction")
+    parser.add_argument('--league', type=int, default=None,
+                        help="Only backtest this league id (default: every league in the store)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Refresh the match store from FBref first")
+    parser.add_argument('--engine', choices=list(ENGINES) + ['compare'], default='forest',
+                        help="Engine to backtest, or 'compare' to run every engine side by side")
+    parser.add_argument('--output', default=None,
+                        help="Optional path to write the report as JSON")
+    args = parser.parse_args()
+
+    engines = tuple(ENGINES) if args.engine == 'compare' else (args.engine,)
+    result = run_backtest(args.retrain_every, args.min_train, args.league, args.refresh, engines)
+    if result and args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import features
+import fbref_scraper
+import predictor
+import train_model
+
+# Data sizes as (seasons, leagues); 20 x 10 is the largest history we expect to hold
+DEFAULT_SIZES = ["1x1", "5x1", "20x10"]
+
+def generate_matches(n_seasons=1, n_leagues=1, teams_per_league=20, seed=0):
+    """
+    Synthetic double round-robin history in the training frame layout
+    (date, home_team, away_team, home_goals, away_goals, home_xg, away_xg).
+    Deterministic for a given seed; no network needed.
+    """
+    rng = np.random.default_rng(seed)
+    n_rounds = 2 * (teams_per_league - 1)
+    frames = []
+    for league in range(n_leagues):
+        teams = [f"L{league} Team {i:02d}" for i in range(teams_per_league)]
+        strength = rng.normal(0.0, 0.3, teams_per_league)
+        for season in range(n_seasons):
+            start = pd.Timestamp(2000 + season, 8, 10)
+            # Circle method: every team plays once per round
+            order = list(range(teams_per_league))
+            home, away, day = [], [], []
+            for rnd in range(n_rounds):
+                for i in range(teams_per_league // 2):
+                    a, b = order[i], order[-1 - i]
+                    if (rnd // (teams_per_league - 1) + i) % 2:
+                        a, b = b, a
+                    home.append(a)
+                    away.append(b)
+                    day.append(7 * rnd + i % 3)
+                order = [order[0], order[-1]] + order[1:-1]
+            home = np.array(home)
+            away = np.array(away)
+            home_xg = np.exp(0.25 + strength[home] - strength[away])
+            away_xg = np.exp(strength[away] - strength[home])
+            frames.append(pd.DataFrame({
+                'date': start + pd.to_timedelta(day, unit='D'),
+                'home_team': np.array(teams, dtype=object)[home],
+                'away_team': np.array(teams, dtype=object)[away],
+                'home_goals': rng.poisson(home_xg).astype(float),
+                'away_goals': rng.poisson(away_xg).astype(float),
+                'home_xg': np.round(home_xg * rng.uniform(0.6, 1.4, len(home)), 1),
+                'away_xg': np.round(away_xg * rng.uniform(0.6, 1.4, len(home)), 1),
+            }))
+    return pd.concat(frames, ignore_index=True).sort_values('date', kind='stable').reset_index(drop=True)
+
+def generate_schedule_html(df):
+    """Renders matches as an FBRef-style 'Scores & Fixtures' page (plus unrelated tables)."""
+    header = ["Wk", "Day", "Date", "Time", "Home", "xG", "Score", "xG", "Away",
+              "Attendance", "Venue", "Referee", "Match Report", "Notes"]
+    parts = ['<html><body><table class="stats_table" id="sched_2000-2001_9_1"><thead><tr>']
+    parts += [f'<th scope="col">{name}</th>' for name in header]
+    parts.append('</tr></thead><tbody>')
+    for i, row in enumerate(df.itertuples(index=False)):
+        if i and i % 10 == 0:
+            parts.append('<tr class="spacer"><td colspan="14"></td></tr>')
+        parts.append(
+            f'<tr><th data-stat="gameweek">{i // 10 + 1}</th><td>Sat</td>'
+            f'<td><a href="/m">{row.date:%Y-%m-%d}</a></td><td>15:00</td>'
+            f'<td><a href="/s">{row.home_team}</a></td><td>{row.home_xg}</td>'
+            f'<td><a href="/m">{int(row.home_goals)}&ndash;{int(row.away_goals)}</a></td>'
+            f'<td>{row.away_xg}</td><td><a href="/s">{row.away_team}</a></td>'
+            f'<td>41,000</td><td>Stadium</td><td>Referee</td><td><a href="/m">Match Report</a></td><td></td></tr>'
+        )
+    parts.append('</tbody></table>')
+    # Other tables on the page that the schedule parser should skip
+    for _ in range(3):
+        parts.append('<table><tr><th>A</th><th>B</th></tr>' +
+                     ''.join(f'<tr><td>{i}</td><td>{i}</td></tr>' for i in range(200)) + '</table>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+def measure(func, repeat=3):
+    """Returns timing (best / mean seconds over `repeat` runs) and peak traced memory."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate run so tracing overhead doesn't skew timings
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'best_s': min(timings),
+        'mean_s': sum(timings) / len(timings),
+        'peak_mem_kb': peak // 1024,
+    }
+
+def prepare_predictor_artifacts(df, directory):
+    """Trains small models on the synthetic history inside `directory` (the artifact root)."""
+    os.chdir(directory)
+    params = dict(train_model.DEFAULT_PARAMS, n_estimators=20)
+    engineered, elo_rater = features.add_elo_ratings(df.copy())
+    engineered = features.calculate_rolling_stats(engineered)
+    engineered = train_model.fit_models(engineered, params)
+    train_model.save_feature_state(engineered, elo_rater, features.TeamFormIndex.from_matches(engineered), fitted=True)
+    predictor.context.reset()
+
+def run_size(size, repeat=3, html_path=None):
+    """Runs every benchmark at one (seasons x leagues) size."""
+    n_seasons, n_leagues = (int(x) for x in size.split("x"))
+    df = generate_matches(n_seasons, n_leagues)
+    teams = pd.unique(df['home_team'])[:20]
+    lambdas = np.random.default_rng(1).uniform(0.2, 3.5, (len(df), 2))
+
+    html = open(html_path, encoding='utf-8').read() if html_path else generate_schedule_html(df)
+
+    benchmarks = {
+        'features.add_elo_ratings': lambda: features.add_elo_ratings(df.copy()),
+        'features.calculate_rolling_stats': lambda: features.calculate_rolling_stats(df.copy()),
+        'predictor.get_latest_stats (20 teams)': lambda: [predictor.get_latest_stats(t, df) for t in teams],
+        'predictor.calculate_probabilities (batch)': lambda: predictor.calculate_probabilities(lambdas[:, 0], lambdas[:, 1]),
+        'fbref_scraper.parse_schedule': lambda: fbref_scraper.parse_schedule(html),
+    }
+
+    results = []
+    for name, func in benchmarks.items():
+        results.append({'benchmark': name, 'size': size, 'n_matches': len(df), **measure(func, repeat)})
+        print(f"  {name:<48} {results[-1]['best_s']:9.4f}s  {results[-1]['peak_mem_kb']:>9} KB")
+
+    # Prediction needs trained artifacts; build them in a scratch directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp_dir:
+        try:
+            prepare_predictor_artifacts(df, tmp_dir)
+            fixtures = [{'home_team': h, 'away_team': a} for h, a in zip(teams[:10], teams[10:20])]
+            predictor.warm_up()
+            def uncached(func):
+                # Measure the model path, not prediction cache lookups
+                def run():
+                    predictor.cache.clear()
+                    return func()
+                return run
+
+            for name, func in {
+                'predictor.predict_match (10 fixtures)': uncached(lambda: [predictor.predict_match(m) for m in fixtures]),
+                'predictor.predict_matches (10 fixtures)': uncached(lambda: predictor.predict_matches(fixtures)),
+                'predictor.predict_matches (10 fixtures, cached)': lambda: predictor.predict_matches(fixtures),
+            }.items():
+                results.append({'benchmark': name, 'size': size, 'n_matches': len(df), **measure(func, repeat)})
+                print(f"  {name:<48} {results[-1]['best_s']:9.4f}s  {results[-1]['peak_mem_kb']:>9} KB")
+        finally:
+            os.chdir(cwd)
+            predictor.context.reset()
+    return results
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and feature hot paths")
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help="Data sizes as SEASONSxLEAGUES (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--html', default=None,
+                        help="Saved FBRef schedule page to benchmark the parser on (default: synthetic)")
+    parser.add_argument('--output', default=None, help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'results': [],
+    }
+    for size in args.sizes:
+        print(f"Size {size} (seasons x leagues):")
+        report['results'].extend(run_size(size, args.repeat, args.html))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
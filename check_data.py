@@ -1,12 +1,23 @@
 
-import pandas as pd
+import os
 import joblib
+import feature_store
 
 try:
-    df = joblib.load('training_data.pkl')
-    print(f"Min Date: {df['date'].min()}")
-    print(f"Max Date: {df['date'].max()}")
-    print(f"Total rows: {len(df)}")
-    print(df.head())
+    if feature_store.exists():
+        # Date range and row count come from the metadata; no column is read for them
+        meta = feature_store.read_meta()
+        print(f"Min Date: {meta['min_date']}")
+        print(f"Max Date: {meta['max_date']}")
+        print(f"Total rows: {meta['n_rows']}")
+        print(feature_store.load().head())
+    elif os.path.exists('training_data.pkl'):
+        df = joblib.load('training_data.pkl')
+        print(f"Min Date: {df['date'].min()}")
+        print(f"Max Date: {df['date'].max()}")
+        print(f"Total rows: {len(df)}")
+        print(df.head())
+    else:
+        print("No training data found. Run train_model.py first.")
 except Exception as e:
     print(f"Error: {e}")
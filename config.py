@@ -14,3 +14,49 @@ SEASON = 2025
 # Demo Mode: Set to False to use real system time and data.
 # Set to True to mock the date (useful if testing with historical data).
 DEMO_MODE = False
+
+# Incremental Training: refit the forests once this many new matches have been
+# ingested, or when the last fit is older than this many days.
+REFIT_MIN_NEW_MATCHES = 10
+REFIT_MAX_AGE_DAYS = 7
+# Rolling-form window (matches) used when neither tuning nor the stored features
+# say otherwise; the original models always used 5.
+FORM_WINDOW = 5
+
+# Scrape Targets: (league_id, season) pairs to track / backfill.
+# League ids follow LEAGUE_ID (see fbref_scraper.COMPETITIONS for supported ones).
+SCRAPE_TARGETS = [(LEAGUE_ID, SEASON)]
+# Concurrent scraper workers, and minimum seconds between requests to the same host
+SCRAPE_MAX_WORKERS = 4
+SCRAPE_MIN_INTERVAL = 2.0
+
+# Scraper HTTP client: User-Agent sent to FBRef and per-request timeout in seconds
+SCRAPE_USER_AGENT = os.getenv(
+    "SCRAPE_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+)
+SCRAPE_TIMEOUT = 30
+
+# Scraper Cache: reuse a scraped page for this many seconds before revalidating
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "900"))
+
+# Prediction Server: address `python prediction_server.py` listens on, and the URL
+# main.py / automation.py send predictions to (unset = predict in-process).
+PREDICTION_SERVER_HOST = os.getenv("PREDICTION_SERVER_HOST", "127.0.0.1")
+PREDICTION_SERVER_PORT = int(os.getenv("PREDICTION_SERVER_PORT", "8765"))
+PREDICTION_SERVER_URL = os.getenv("PREDICTION_SERVER_URL", "")
+PREDICTION_SERVER_TIMEOUT = 10
+
+# Prediction Cache: most recent predictions kept in memory, and an optional JSON file
+# to persist them across runs (e.g. data/cache/predictions.json; unset = memory only).
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH", "")
+# Persisted cache writes: at most every N seconds or after N new entries (and at exit)
+PREDICTION_CACHE_SAVE_INTERVAL = 30
+PREDICTION_CACHE_SAVE_EVERY = 256
+
+# Prediction Engine: 'forest' (random forests on Elo / form features) or
+# 'dixon_coles' (attack/defence Poisson model; much cheaper to train and load).
+PREDICTION_ENGINE = os.getenv("PREDICTION_ENGINE", "forest")
+# Dixon-Coles time decay per day: matches a year old weigh about half as much
+DIXON_COLES_XI = 0.0019
@@ -0,0 +1,161 @@
+import json
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+# Dixon-Coles (1997) attack / defence Poisson model:
+#   home goals ~ Poisson(exp(intercept + home_advantage + attack[home] + defence[away]))
+#   away goals ~ Poisson(exp(intercept + attack[away] + defence[home]))
+# with the low-score correction tau(rho) on 0-0, 1-0, 0-1 and 1-1, and matches
+# weighted by exp(-xi * days_ago) so recent form counts more.
+# The whole model is two floats per team plus three scalars.
+
+DEFAULT_XI = 0.0019 # per day (half-life ~ 1 year); config.DIXON_COLES_XI overrides it in training
+DEFAULT_L2 = 0.01 # ridge on attack / defence; keeps sparse teams near average
+RHO_BOUNDS = (-0.2, 0.2)
+
+def low_score_tau(home_goals, away_goals, lam, mu, rho):
+    """Dixon-Coles correction factor for each match (1 outside the four low scores)."""
+    tau = np.ones_like(lam)
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - lam * mu * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + lam * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + mu * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+    return tau
+
+class DixonColesModel:
+    def __init__(self, teams, attack, defence, home_advantage, intercept, rho, xi=DEFAULT_XI, meta=None):
+        self.teams = list(teams)
+        self.attack = np.asarray(attack, dtype=np.float64)
+        self.defence = np.asarray(defence, dtype=np.float64)
+        self.home_advantage = float(home_advantage)
+        self.intercept = float(intercept)
+        self.rho = float(rho)
+        self.xi = float(xi)
+        self.meta = dict(meta or {})
+        self._team_index = {team: i for i, team in enumerate(self.teams)}
+
+    def team_ids(self, teams):
+        """Team indices, -1 for teams the model has never seen (each distinct name looked up once)."""
+        if not isinstance(teams, pd.Series):
+            teams = pd.Series(list(teams), dtype=object)
+        codes, uniques = pd.factorize(teams)
+        lookup = np.array([self._team_index.get(team, -1) for team in uniques] + [-1], dtype=np.intp)
+        return lookup[codes]
+
+    def expected_goals(self, home_teams, away_teams):
+        """Expected (home, away) goals per fixture; NaN where a team is unknown."""
+        h = self.team_ids(home_teams)
+        a = self.team_ids(away_teams)
+        known = (h >= 0) & (a >= 0)
+        lam = np.exp(self.intercept + self.home_advantage + self.attack[h] + self.defence[a])
+        mu = np.exp(self.intercept + self.attack[a] + self.defence[h])
+        return np.where(known, lam, np.nan), np.where(known, mu, np.nan)
+
+    def to_dict(self):
+        return {
+            'teams': self.teams,
+            'attack': self.attack.round(8).tolist(),
+            'defence': self.defence.round(8).tolist(),
+            'home_advantage': self.home_advantage,
+            'intercept': self.intercept,
+            'rho': self.rho,
+            'xi': self.xi,
+            **self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        meta = {k: v for k, v in data.items()
+                if k not in ('teams', 'attack', 'defence', 'home_advantage', 'intercept', 'rho', 'xi')}
+        return cls(data['teams'], data['attack'], data['defence'], data['home_advantage'],
+                   data['intercept'], data['rho'], data.get('xi', DEFAULT_XI), meta)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+def _negative_log_likelihood(params, h, a, hg, ag, weights, n_teams, l2):
+    """Weighted negative log-likelihood (up to constants) and its analytic gradient."""
+    attack = params[:n_teams]
+    defence = params[n_teams:2 * n_teams]
+    home_advantage, intercept, rho = params[2 * n_teams:]
+
+    lam = np.exp(intercept + home_advantage + attack[h] + defence[a])
+    mu = np.exp(intercept + attack[a] + defence[h])
+    tau = np.maximum(low_score_tau(hg, ag, lam, mu, rho), 1e-10)
+
+    nll = -np.sum(weights * (np.log(tau) + hg * np.log(lam) - lam + ag * np.log(mu) - mu))
+    nll += l2 * (attack @ attack + defence @ defence)
+
+    # d log(tau) / d log(lam), d log(mu) and d rho for the four corrected scores
+    s00 = (hg == 0) & (ag == 0)
+    s01 = (hg == 0) & (ag == 1)
+    s10 = (hg == 1) & (ag == 0)
+    s11 = (hg == 1) & (ag == 1)
+    dtau_dloglam = np.where(s00, -lam * mu * rho, 0.0) + np.where(s01, lam * rho, 0.0)
+    dtau_dlogmu = np.where(s00, -lam * mu * rho, 0.0) + np.where(s10, mu * rho, 0.0)
+    dtau_drho = (np.where(s00, -lam * mu, 0.0) + np.where(s01, lam, 0.0)
+                 + np.where(s10, mu, 0.0) - s11)
+
+    # Gradient of the NLL with respect to log(lam) and log(mu) per match
+    g_lam = -weights * (hg - lam + dtau_dloglam / tau)
+    g_mu = -weights * (ag - mu + dtau_dlogmu / tau)
+
+    grad = np.empty_like(params)
+    grad[:n_teams] = np.bincount(h, g_lam, n_teams) + np.bincount(a, g_mu, n_teams) + 2 * l2 * attack
+    grad[n_teams:2 * n_teams] = np.bincount(a, g_lam, n_teams) + np.bincount(h, g_mu, n_teams) + 2 * l2 * defence
+    grad[2 * n_teams] = g_lam.sum()
+    grad[2 * n_teams + 1] = g_lam.sum() + g_mu.sum()
+    grad[2 * n_teams + 2] = -np.sum(weights * dtau_drho / tau)
+    return nll, grad
+
+def fit(df, xi=DEFAULT_XI, l2=DEFAULT_L2, as_of=None):
+    """
+    Fits the model by weighted maximum likelihood (L-BFGS-B with an analytic gradient).
+    df: played matches with date, home_team, away_team, home_goals, away_goals.
+    as_of: date the time decay is measured from (default: the last match).
+    """
+    # scipy is only needed to fit, never to predict
+    from scipy.optimize import minimize
+
+    df = df.dropna(subset=['home_goals', 'away_goals'])
+    teams = sorted(pd.unique(pd.concat([df['home_team'], df['away_team']])))
+    team_index = {team: i for i, team in enumerate(teams)}
+    n_teams = len(teams)
+
+    h = df['home_team'].map(team_index).to_numpy(dtype=np.intp)
+    a = df['away_team'].map(team_index).to_numpy(dtype=np.intp)
+    hg = df['home_goals'].to_numpy(dtype=np.float64)
+    ag = df['away_goals'].to_numpy(dtype=np.float64)
+
+    dates = pd.to_datetime(df['date'])
+    as_of = pd.Timestamp(as_of) if as_of is not None else dates.max()
+    days_ago = ((as_of - dates).dt.total_seconds() / 86400).clip(lower=0).to_numpy()
+    weights = np.exp(-xi * days_ago)
+
+    start = np.zeros(2 * n_teams + 3)
+    start[2 * n_teams] = 0.25 # home advantage
+    start[2 * n_teams + 1] = np.log(max((hg.mean() + ag.mean()) / 2, 0.1))
+    bounds = [(None, None)] * (2 * n_teams + 2) + [RHO_BOUNDS]
+
+    result = minimize(_negative_log_likelihood, start, args=(h, a, hg, ag, weights, n_teams, l2),
+                      jac=True, method='L-BFGS-B', bounds=bounds)
+    if not result.success:
+        print(f"Dixon-Coles fit did not fully converge: {result.message}")
+
+    params = result.x
+    return DixonColesModel(
+        teams, params[:n_teams], params[n_teams:2 * n_teams],
+        params[2 * n_teams], params[2 * n_teams + 1], params[2 * n_teams + 2], xi,
+        meta={
+            'n_matches': int(len(df)),
+            'last_match_date': as_of.strftime('%Y-%m-%d'),
+            'fitted_at': datetime.now(timezone.utc).isoformat(),
+        },
+    )
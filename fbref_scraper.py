@@ -3,116 +3,400 @@ import requests
 import time
 import random
 import os
+import json
+import hashlib
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import config
+import metrics
+import utils_data
 
-# URL for Premier League Schedule and Results (2025-2026 Season - generic placeholders for now)
-# Usually FBref URLs format: https://fbref.com/en/comps/9/schedule/Premier-League-Scores-and-Fixtures
-FBREF_URL = "https://fbref.com/en/comps/9/schedule/Premier-League-Scores-and-Fixtures"
+# League ids (API-Football numbering, as in config.LEAGUE_ID) -> (FBref comp id, URL slug)
+COMPETITIONS = {
+    39: (9, "Premier-League"),
+    40: (10, "Championship"),
+    140: (12, "La-Liga"),
+    135: (11, "Serie-A"),
+    78: (20, "Bundesliga"),
+    61: (13, "Ligue-1"),
+}
 
-def scrape_data():
+def build_schedule_url(league_id, season):
     """
-    Scrapes FBref for PL fixtures.
-    Returns a tuple: (completed_df, upcoming_df)
+    Returns the FBref 'Scores and Fixtures' URL for a league and season
+    (season = starting year, e.g. 2025 for 2025-2026).
     """
-    print("Scraping FBref.com...")
-    
-    # Random sleep to be polite
-    time.sleep(random.uniform(1, 3))
-    
+    comp_id, slug = COMPETITIONS[league_id]
+    if season == config.SEASON:
+        # Usually FBref URLs format: https://fbref.com/en/comps/9/schedule/Premier-League-Scores-and-Fixtures
+        return f"https://fbref.com/en/comps/{comp_id}/schedule/{slug}-Scores-and-Fixtures"
+    label = f"{season}-{season + 1}"
+    return f"https://fbref.com/en/comps/{comp_id}/{label}/schedule/{label}-{slug}-Scores-and-Fixtures"
+
+# URL for the configured league's current season Schedule and Results
+FBREF_URL = build_schedule_url(config.LEAGUE_ID, config.SEASON)
+
+class RateLimiter:
+    """
+    Shared, thread-safe politeness limiter: requests to the same host start at
+    least `min_interval` seconds apart (plus a little jitter), however many
+    workers are fetching.
+    """
+    def __init__(self, min_interval, jitter=0.5):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = {} # host -> earliest time the next request may start
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.min_interval + random.uniform(0, self.jitter)
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+rate_limiter = RateLimiter(config.SCRAPE_MIN_INTERVAL)
+
+# On-disk response cache: per URL, a metadata file naming the parsed frame it describes
+CACHE_DIR = os.path.join("data", "cache", "fbref")
+
+def _cache_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def _meta_path(url):
+    return os.path.join(CACHE_DIR, f"{_cache_key(url)}.json")
+
+def _load_cache(url):
+    """Returns (meta, parsed_df) for a cached URL, or (None, None)."""
+    meta_path = _meta_path(url)
+    if not os.path.exists(meta_path):
+        return None, None
     try:
-        # Fallback to system curl command to bypass potential python-requests blocking (TLS fingerprinting)
-        import subprocess
-        
-        # We'll save to a temp file
-        temp_file = "fbref_data.html"
-        cmd = [
-            "curl", 
-            "-A", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "-o", temp_file,
-            FBREF_URL
-        ]
-        
-        print("Running system curl...")
-        subprocess.run(cmd, check=True)
-        
-        # Read the file
-        dfs = pd.read_html(temp_file)
-        
-        # Clean up optional
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        frame_path = os.path.join(CACHE_DIR, meta['frame'])
+        if not os.path.exists(frame_path):
+            return None, None
+        return meta, pd.read_pickle(frame_path)
+    except Exception as e:
+        print(f"Ignoring unreadable scrape cache for {url}: {e}")
+        return None, None
+
+def _save_cache(url, meta, df=None):
+    """
+    Writes cache metadata (and the parsed frame if given) for a URL.
+    Frames are stored under their content hash and the metadata is written last,
+    so concurrent scrapes never pair one run's ETag with another run's frame.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path = _meta_path(url)
+    previous = None
+    if df is not None:
+        previous = utils_data.load_json(meta_path)
+        data = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = dict(meta, frame=f"{_cache_key(url)}.{hashlib.sha1(data).hexdigest()[:16]}.pkl")
+        utils_data.write_atomic(os.path.join(CACHE_DIR, meta['frame']), data)
+    utils_data.write_atomic(meta_path, json.dumps(meta))
+
+    # Drop the frame the replaced metadata pointed at
+    if previous and previous.get('frame') not in (None, meta['frame']):
         try:
-             os.remove(temp_file)
-        except:
-             pass
-        
-        # usually the first table is the schedule
-        df = dfs[0]
-        
-        # Clean basic columns
-        # Filter rows that are actual matches (exclude headers repeated in table)
-        if 'Wk' in df.columns:
-            df = df[df['Wk'] != 'Wk']
-            # Rename for consistency
-            df = df.rename(columns={'Wk': 'gameweek'})
-        
-        # Convert Date
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        
-        # Split Score "2–1" into HomeGoals, AwayGoals
-        # Score column format is usually "2–1"
-        def parse_score(score_str):
-            try:
-                if pd.isna(score_str) or '–' not in str(score_str):
-                    return None, None
-                parts = str(score_str).split('–')
-                return int(parts[0]), int(parts[1])
-            except:
-                return None, None
-
-        if 'Score' not in df.columns:
-             print("Warning: 'Score' column not found in scraped data. Structure might have changed.")
-             return pd.DataFrame(), pd.DataFrame()
-
-        df[['HomeGoals', 'AwayGoals']] = df['Score'].apply(lambda x: pd.Series(parse_score(x)))
-        
-        # Extract xG (Expected Goals)
-        # FBRef usually has valid xG columns named 'xG' and 'xG.1' (for away)
-        # We need to be careful as they might not imply Home/Away depending on table structure,
-        # but in the Schedule table: Home, xG, Score, xG, Away is standard.
-        # Pandas read_html likely renames the second xG to xG.1
-        
-        if 'xG' in df.columns:
-            # Check if there is a duplicate (the away one)
-            xg_cols = [c for c in df.columns if 'xG' in c]
-            if len(xg_cols) >= 2:
-                # Assuming standard order: Home comes first
-                df = df.rename(columns={xg_cols[0]: 'home_xg', xg_cols[1]: 'away_xg'})
-                
-                # Convert to numeric
-                df['home_xg'] = pd.to_numeric(df['home_xg'], errors='coerce')
-                df['away_xg'] = pd.to_numeric(df['away_xg'], errors='coerce')
-            else:
-                print("Warning: Only one xG column found. Skipping xG extraction.")
-                df['home_xg'] = None
-                df['away_xg'] = None
+            os.remove(os.path.join(CACHE_DIR, previous['frame']))
+        except OSError:
+            pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the shared requests.Session: a persistent, thread-safe connection
+    pool sized for the scraper workers, reused across every fetch.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, config.SCRAPE_MAX_WORKERS), max_retries=2)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "User-Agent": config.SCRAPE_USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml",
+                    "Accept-Encoding": "gzip, deflate",
+                })
+                _session = session
+    return _session
+
+def _fetch_with_curl(url):
+    """
+    Last-resort fetch through system curl for when FBref blocks python-requests
+    (TLS fingerprinting). The body is streamed through stdout, never a temp file.
+    """
+    import subprocess
+
+    print("Request blocked. Retrying with system curl...")
+    out = subprocess.run(
+        ["curl", "-s", "--compressed", "-A", config.SCRAPE_USER_AGENT, "-w", "\n%{http_code}", url],
+        check=True, capture_output=True,
+    )
+    body, _, status = out.stdout.rpartition(b"\n")
+    return int(status or 0), body, {}
+
+def _fetch_page(url, etag=None, last_modified=None):
+    """
+    Downloads a page in-process over the pooled session, sending conditional
+    headers when we have them. The body is decompressed as it streams in and
+    kept in memory. Returns (status_code, body_bytes_or_None, response_headers).
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    with get_session().get(url, headers=headers, stream=True, timeout=config.SCRAPE_TIMEOUT) as resp:
+        status = resp.status_code
+        response_headers = {k.lower(): v for k, v in resp.headers.items()}
+        body = None
+        if status == 200:
+            body = b"".join(resp.iter_content(chunk_size=64 * 1024))
+
+    if status == 403:
+        return _fetch_with_curl(url)
+    return status, body, response_headers
+
+def _cell_text(cell):
+    text = cell.text_content().strip()
+    return text if text else None
+
+def _read_schedule_table(html):
+    """
+    Locates only the fixtures table with lxml and returns its raw string columns
+    as a DataFrame (duplicate headers get pandas-style '.1' suffixes).
+    """
+    import lxml.html
+
+    root = lxml.html.fromstring(html)
+    # FBRef schedule tables have ids like 'sched_2025-2026_9_1'
+    tables = root.xpath("//table[starts-with(@id, 'sched')]") or root.xpath("//table")
+    if not tables:
+        return pd.DataFrame()
+    table = tables[0]
+
+    header_rows = table.xpath("./thead/tr")
+    header_cells = header_rows[-1].xpath("./th|./td") if header_rows else []
+    columns = []
+    seen = {}
+    for cell in header_cells:
+        name = cell.text_content().strip()
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
         else:
+            seen[name] = 0
+        columns.append(name)
+
+    records = []
+    for row in table.xpath("./tbody/tr"):
+        # Skip repeated header rows and blank spacer rows between gameweeks
+        row_class = row.get('class') or ''
+        if 'thead' in row_class or 'spacer' in row_class:
+            continue
+        values = [_cell_text(cell) for cell in row.xpath("./th|./td")]
+        if len(values) != len(columns) or all(v is None for v in values):
+            continue
+        records.append(values)
+
+    return pd.DataFrame.from_records(records, columns=columns)
+
+def parse_schedule(html):
+    """
+    Parses the FBRef schedule page (str or raw bytes) into a cleaned fixtures DataFrame
+    (gameweek, Date, HomeGoals, AwayGoals, home_xg, away_xg, ...).
+    """
+    df = _read_schedule_table(html)
+
+    if df.empty:
+        print("Warning: schedule table not found in scraped data. Structure might have changed.")
+        return pd.DataFrame()
+
+    # Clean basic columns
+    # Filter rows that are actual matches (exclude headers repeated in table)
+    if 'Wk' in df.columns:
+        df = df[df['Wk'] != 'Wk']
+        # Rename for consistency
+        df = df.rename(columns={'Wk': 'gameweek'})
+        df['gameweek'] = pd.to_numeric(df['gameweek'], errors='coerce').astype('Int64')
+
+    # Convert Date
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+
+    if 'Attendance' in df.columns:
+        df['Attendance'] = pd.to_numeric(df['Attendance'].str.replace(',', '', regex=False), errors='coerce')
+
+    if 'Score' not in df.columns:
+        print("Warning: 'Score' column not found in scraped data. Structure might have changed.")
+        return pd.DataFrame()
+
+    # Split Score "2–1" into HomeGoals, AwayGoals
+    # Score column format is usually "2–1" (en dash), vectorized over the whole column
+    goals = df['Score'].str.extract(r'(\d+)\s*–\s*(\d+)')
+    df['HomeGoals'] = pd.to_numeric(goals[0]).astype(float)
+    df['AwayGoals'] = pd.to_numeric(goals[1]).astype(float)
+
+    # Extract xG (Expected Goals)
+    # In the Schedule table: Home, xG, Score, xG, Away is standard,
+    # so the duplicate header is suffixed as xG.1 (away)
+    if 'xG' in df.columns:
+        # Check if there is a duplicate (the away one)
+        xg_cols = [c for c in df.columns if 'xG' in c]
+        if len(xg_cols) >= 2:
+            # Assuming standard order: Home comes first
+            df = df.rename(columns={xg_cols[0]: 'home_xg', xg_cols[1]: 'away_xg'})
+
+            # Convert to numeric
+            df['home_xg'] = pd.to_numeric(df['home_xg'], errors='coerce')
+            df['away_xg'] = pd.to_numeric(df['away_xg'], errors='coerce')
+        else:
+            print("Warning: Only one xG column found. Skipping xG extraction.")
             df['home_xg'] = None
             df['away_xg'] = None
-        
-        # Filter Completed Matches (Have Goals)
-        completed_matches = df.dropna(subset=['HomeGoals', 'AwayGoals']).copy()
-        
-        # Filter Upcoming Matches (No Goals, Future Date)
-        # We can just check if Score is NaN and Date is valid
-        upcoming_fixtures = df[df['Score'].isna()].copy()
-        
-        # Sort upcoming by Date
-        upcoming_fixtures = upcoming_fixtures.sort_values(by='Date')
-        
-        # Filter to only future from TODAY (optional, but good for "upcoming")
-        today = pd.Timestamp.now().normalize()
-        upcoming_fixtures = upcoming_fixtures[upcoming_fixtures['Date'] >= today]
+    else:
+        df['home_xg'] = None
+        df['away_xg'] = None
+
+    return df.reset_index(drop=True)
+
+def split_fixtures(df):
+    """Splits a parsed schedule into (completed_df, upcoming_df)."""
+    # Filter Completed Matches (Have Goals)
+    completed_matches = df.dropna(subset=['HomeGoals', 'AwayGoals']).copy()
+
+    # Filter Upcoming Matches (No Goals, Future Date)
+    # We can just check if Score is NaN and Date is valid
+    upcoming_fixtures = df[df['Score'].isna()].copy()
+
+    # Sort upcoming by Date
+    upcoming_fixtures = upcoming_fixtures.sort_values(by='Date')
+
+    # Filter to only future from TODAY (optional, but good for "upcoming")
+    today = pd.Timestamp.now().normalize()
+    upcoming_fixtures = upcoming_fixtures[upcoming_fixtures['Date'] >= today]
+
+    return completed_matches, upcoming_fixtures
+
+def fetch_schedule(url=FBREF_URL, use_cache=True):
+    """
+    Returns the parsed schedule DataFrame for a URL.
+    Fresh cache entries (younger than config.SCRAPE_CACHE_TTL) are returned without
+    any request; stale ones are revalidated with ETag / Last-Modified, and a
+    304 reuses the cached parsed frame instead of re-parsing the page.
+    """
+    meta, cached_df = _load_cache(url) if use_cache else (None, None)
+
+    if cached_df is not None and time.time() - meta.get('fetched_at', 0) < config.SCRAPE_CACHE_TTL:
+        print("Using cached FBref schedule.")
+        metrics.incr('scrape.cache_hits')
+        return cached_df
+
+    # Be polite: shared per-host rate limit (only when we actually hit the network)
+    rate_limiter.wait(url)
+
+    try:
+        with metrics.span('fetch.http'):
+            status, body, headers = _fetch_page(
+                url,
+                etag=meta.get('etag') if cached_df is not None else None,
+                last_modified=meta.get('last_modified') if cached_df is not None else None,
+            )
+        metrics.incr('scrape.requests')
+    except Exception as e:
+        if cached_df is not None:
+            print(f"Error fetching FBref ({e}). Falling back to cached schedule.")
+            metrics.incr('scrape.cache_fallbacks')
+            return cached_df
+        raise
+
+    if status == 304 and cached_df is not None:
+        print("FBref schedule not modified. Reusing cached data.")
+        metrics.incr('scrape.not_modified')
+        meta['fetched_at'] = time.time()
+        _save_cache(url, meta)
+        return cached_df
+
+    if status != 200:
+        if cached_df is not None:
+            print(f"FBref returned HTTP {status}. Falling back to cached schedule.")
+            metrics.incr('scrape.cache_fallbacks')
+            return cached_df
+        raise RuntimeError(f"FBref returned HTTP {status}")
+
+    metrics.incr('scrape.bytes', len(body))
+    with metrics.span('parse'):
+        df = parse_schedule(body)
+
+    if use_cache and not df.empty:
+        _save_cache(url, {
+            'url': url,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'fetched_at': time.time(),
+        }, df)
+    return df
+
+def scrape_many(targets, max_workers=None, use_cache=True):
+    """
+    Fetches the schedules of several (league_id, season) targets concurrently on a
+    bounded thread pool; the shared rate limiter keeps requests per host polite.
+    Returns a dict: (league_id, season) -> parsed schedule DataFrame
+    (with league_id and season columns). Failed targets are reported and skipped.
+    """
+    targets = list(dict.fromkeys(targets))
+    if max_workers is None:
+        max_workers = config.SCRAPE_MAX_WORKERS
+
+    def fetch(target):
+        league_id, season = target
+        df = fetch_schedule(build_schedule_url(league_id, season), use_cache=use_cache)
+        if not df.empty:
+            df = df.assign(league_id=league_id, season=season)
+        return df
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets) or 1))) as pool:
+        futures = {target: pool.submit(fetch, target) for target in targets}
+        for target, future in futures.items():
+            try:
+                results[target] = future.result()
+            except Exception as e:
+                print(f"Error scraping FBref for league {target[0]} season {target[1]}: {e}")
+    return results
+
+def scrape_data(url=FBREF_URL, use_cache=True):
+    """
+    Scrapes FBref for PL fixtures.
+    Returns a tuple: (completed_df, upcoming_df)
+    """
+    print("Scraping FBref.com...")
+
+    try:
+        df = fetch_schedule(url, use_cache=use_cache)
+
+        if df.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        completed_matches, upcoming_fixtures = split_fixtures(df)
 
         print(f"Scraped {len(completed_matches)} completed matches and {len(upcoming_fixtures)} upcoming fixtures.")
-        
+
         return completed_matches, upcoming_fixtures
 
     except Exception as e:
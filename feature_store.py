@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import team_registry
+import utils_data
+
+# Columnar store of the engineered training frame: one .npy file per column in
+# a directory, plus meta.json with the row count, date range, dtypes and the
+# team names behind the team id columns. Only the columns training, incremental
+# runs and the form index need are kept, in compact dtypes, and every column can
+# be memory-mapped, so readers only touch the columns (and pages) they use.
+STORE_DIR = 'training_data'
+META_FILE = 'meta.json'
+FORMAT_VERSION = 1
+
+# Column -> on-disk dtype. Features are float32: the forests compare in float32 anyway.
+COLUMNS = {
+    'date': 'datetime64[s]',
+    'home_team_id': 'int32',
+    'away_team_id': 'int32',
+    'home_goals': 'int16',
+    'away_goals': 'int16',
+    'home_xg': 'float32',
+    'away_xg': 'float32',
+    'home_elo': 'float32',
+    'away_elo': 'float32',
+    'home_rolling_goals': 'float32',
+    'away_rolling_goals': 'float32',
+    'home_rolling_xg': 'float32',
+    'away_rolling_xg': 'float32',
+}
+
+# Team name columns rebuilt (as categoricals) from their id columns on load
+TEAM_COLUMNS = {'home_team': 'home_team_id', 'away_team': 'away_team_id'}
+
+def meta_path(directory=STORE_DIR):
+    return os.path.join(directory, META_FILE)
+
+def exists(directory=STORE_DIR):
+    return os.path.exists(meta_path(directory))
+
+def _column_array(df, name, dtype):
+    if name == 'date':
+        return pd.to_datetime(df['date']).to_numpy().astype(dtype)
+    if name in ('home_xg', 'away_xg'):
+        # Scraper might return None for xG if missing
+        return pd.to_numeric(df[name]).to_numpy(dtype=np.float64).astype(dtype)
+    return pd.to_numeric(df[name]).to_numpy(dtype=dtype)
+
+def save(df, directory=STORE_DIR, window=None):
+    """
+    Writes the frame's known columns (others are dropped) and the metadata.
+    window: rolling-form window the rolling columns were computed with.
+    The new store is built next to the old one and swapped in, so readers never
+    see a half-written store.
+    """
+    if 'home_team_id' not in df.columns or 'away_team_id' not in df.columns:
+        team_registry.encode(df)
+
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        if name in df.columns:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), _column_array(df, name, dtype))
+            columns[name] = dtype
+
+    dates = pd.to_datetime(df['date'])
+    meta = {
+        'format': FORMAT_VERSION,
+        'n_rows': int(len(df)),
+        'min_date': dates.min().isoformat() if len(df) else None,
+        'max_date': dates.max().isoformat() if len(df) else None,
+        'columns': columns,
+        'window': window,
+        'teams': team_registry.get_registry().teams,
+        'written_at': datetime.now(timezone.utc).isoformat(),
+    }
+    utils_data.write_atomic(meta_path(tmp_dir), json.dumps(meta, indent=1))
+
+    old_dir = f"{directory}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+def read_meta(directory=STORE_DIR):
+    """The store's metadata (row count, date range, columns) without reading any column."""
+    with open(meta_path(directory), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_arrays(columns=None, directory=STORE_DIR, mmap=True):
+    """dict of column -> array (read-only memory maps unless mmap is False)."""
+    meta = read_meta(directory)
+    names = list(meta['columns']) if columns is None else [c for c in columns if c in meta['columns']]
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None, allow_pickle=False)
+            for name in names}
+
+def load(columns=None, directory=STORE_DIR, mmap=True):
+    """
+    The stored frame, or just `columns` of it. home_team / away_team can be
+    requested by name; they come back as categoricals of the stored team names.
+    """
+    meta = read_meta(directory)
+    wanted = list(meta['columns']) + list(TEAM_COLUMNS) if columns is None else list(columns)
+    array_names = [c for c in wanted if c in meta['columns']]
+    array_names += [TEAM_COLUMNS[c] for c in wanted if c in TEAM_COLUMNS and TEAM_COLUMNS[c] not in array_names]
+    arrays = load_arrays(array_names, directory, mmap)
+
+    teams = pd.Index(meta['teams'], dtype=object)
+    data = {}
+    for name in wanted:
+        if name in TEAM_COLUMNS:
+            data[name] = pd.Categorical.from_codes(np.asarray(arrays[TEAM_COLUMNS[name]]), categories=teams)
+        elif name in arrays:
+            data[name] = arrays[name]
+    return pd.DataFrame(data, copy=False)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or convert the columnar training feature store")
+    parser.add_argument('command', choices=['info', 'migrate'])
+    parser.add_argument('--pickle', default='training_data.pkl', help="With migrate: pickled training frame to convert")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps({k: v for k, v in read_meta().items() if k != 'teams'}, indent=4))
+    else:
+        import joblib
+        meta = save(joblib.load(args.pickle))
+        print(f"Wrote {meta['n_rows']} rows ({len(meta['columns'])} columns) to {STORE_DIR}/")
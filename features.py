@@ -2,118 +2,267 @@ import pandas as pd
 import numpy as np
 
 class EloRater:
+    """
+    Elo ratings stored in a NumPy array indexed by integer team ids.
+    `team_index` maps team names to ids; `ratings` is kept as a read-only
+    dict view for older callers.
+    """
     def __init__(self, k_factor=30, initial_rating=1500):
         self.k_factor = k_factor
-        self.ratings = {} # dict: team_name -> rating
         self.initial_rating = initial_rating
+        self.team_index = {} # dict: team_name -> id (row in rating_array)
+        self.rating_array = np.zeros(0)
+
+    def __setstate__(self, state):
+        # Migrate pickles from the dict-based rater: {'ratings': {team: rating}}
+        old_ratings = state.pop('ratings', None)
+        self.__dict__.update(state)
+        if old_ratings is not None:
+            self.team_index = {team: i for i, team in enumerate(old_ratings)}
+            self.rating_array = np.array(list(old_ratings.values()), dtype=float)
+
+    @property
+    def ratings(self):
+        """dict: team_name -> rating (built on demand)."""
+        return {team: float(self.rating_array[i]) for team, i in self.team_index.items()}
+
+    def team_ids(self, teams):
+        """Returns int ids for an iterable of team names, registering unseen teams."""
+        # Categorical columns factorize on their codes, so each team name is hashed once
+        if not isinstance(teams, pd.Series):
+            teams = pd.Series(list(teams), dtype=object)
+        codes, uniques = pd.factorize(teams)
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        new_teams = 0
+        for i, team in enumerate(uniques):
+            idx = self.team_index.get(team)
+            if idx is None:
+                idx = len(self.team_index)
+                self.team_index[team] = idx
+                new_teams += 1
+            lookup[i] = idx
+        if new_teams:
+            self.rating_array = np.concatenate([self.rating_array, np.full(new_teams, float(self.initial_rating))])
+        return lookup[codes]
 
     def get_rating(self, team):
-        return self.ratings.get(team, self.initial_rating)
+        idx = self.team_index.get(team)
+        if idx is None:
+            return self.initial_rating
+        return float(self.rating_array[idx])
 
     def expected_result(self, rating_a, rating_b):
         """Calculates expected score (probability of winning) for A vs B."""
         return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
 
+    def replay(self, home_ids, away_ids, home_goals, away_goals):
+        """
+        Replays a chronological match history from pre-extracted arrays,
+        continuing from the current ratings.
+        Returns arrays of PRE-MATCH (home, away) ratings.
+        """
+        home_goals = np.asarray(home_goals, dtype=float)
+        away_goals = np.asarray(away_goals, dtype=float)
+        # Actual home result: 1 win, 0.5 draw, 0 loss (away result is 1 - that)
+        actual_h = np.where(home_goals > away_goals, 1.0, np.where(home_goals == away_goals, 0.5, 0.0)).tolist()
+
+        # Plain Python lists/floats are much faster than NumPy scalars in a sequential loop
+        ratings = self.rating_array.tolist()
+        hi = np.asarray(home_ids).tolist()
+        ai = np.asarray(away_ids).tolist()
+        k = self.k_factor
+        n = len(hi)
+        pre_h = [0.0] * n
+        pre_a = [0.0] * n
+
+        for i in range(n):
+            h = hi[i]
+            a = ai[i]
+            rate_h = ratings[h]
+            rate_a = ratings[a]
+            pre_h[i] = rate_h
+            pre_a[i] = rate_a
+            # One power per match: expected_a == 1 - expected_h
+            expected_h = 1.0 / (1.0 + 10.0 ** ((rate_a - rate_h) / 400.0))
+            delta = k * (actual_h[i] - expected_h)
+            ratings[h] = rate_h + delta
+            ratings[a] = rate_a - delta
+
+        self.rating_array = np.array(ratings, dtype=float)
+        return np.array(pre_h), np.array(pre_a)
+
     def update_ratings(self, home_team, away_team, home_goals, away_goals):
-        rate_h = self.get_rating(home_team)
-        rate_a = self.get_rating(away_team)
-        
-        # Determine actual result
-        if home_goals > away_goals:
-            actual_h = 1.0
-            actual_a = 0.0
-        elif home_goals == away_goals:
-            actual_h = 0.5
-            actual_a = 0.5
-        else:
-            actual_h = 0.0
-            actual_a = 1.0
-            
-        expected_h = self.expected_result(rate_h, rate_a)
-        expected_a = self.expected_result(rate_a, rate_h)
-        
-        new_rate_h = rate_h + self.k_factor * (actual_h - expected_h)
-        new_rate_a = rate_a + self.k_factor * (actual_a - expected_a)
-        
-        self.ratings[home_team] = new_rate_h
-        self.ratings[away_team] = new_rate_a
-        
-        return rate_h, rate_a # Return PRE-MATCH ratings
+        ids = self.team_ids([home_team, away_team])
+        pre_h, pre_a = self.replay(ids[:1], ids[1:], [home_goals], [away_goals])
+        return float(pre_h[0]), float(pre_a[0]) # Return PRE-MATCH ratings
 
 def calculate_rolling_stats(df, window=5):
     """
     Calculates rolling averages for goals and xG for each team.
     df must be sorted by Date.
+    Each value only uses the team's matches BEFORE that row (no leakage).
     """
-    team_stats = {} # team -> list of matches (dicts)
-    
-    # Initialize output columns
-    home_form_goals = []
-    away_form_goals = []
-    home_form_xg = []
-    away_form_xg = []
-    
-    for idx, row in df.iterrows():
-        h_team = row['home_team']
-        a_team = row['away_team']
-        
-        # Get Stats BEFORE this match
-        h_stats = team_stats.get(h_team, [])
-        a_stats = team_stats.get(a_team, [])
-        
-        # Calculate Rolling Averages
-        def get_avg(stats, key):
-            if not stats: return 0.0
-            recent = stats[-window:]
-            vals = [s[key] for s in recent if s[key] is not None]
-            return sum(vals) / len(vals) if vals else 0.0
-            
-        home_form_goals.append(get_avg(h_stats, 'goals_scored'))
-        away_form_goals.append(get_avg(a_stats, 'goals_scored'))
-        home_form_xg.append(get_avg(h_stats, 'xg_for'))
-        away_form_xg.append(get_avg(a_stats, 'xg_for'))
-        
-        # Update Stats AFTER this match (for next iteration)
-        # Note: Scraper might return None for xG if missing
-        h_xg = row['home_xg'] if not pd.isna(row.get('home_xg')) else 0.0
-        a_xg = row['away_xg'] if not pd.isna(row.get('away_xg')) else 0.0
-        
-        h_rec = {'goals_scored': row['home_goals'], 'xg_for': h_xg}
-        a_rec = {'goals_scored': row['away_goals'], 'xg_for': a_xg}
-        
-        team_stats.setdefault(h_team, []).append(h_rec)
-        team_stats.setdefault(a_team, []).append(a_rec)
-        
-    df['home_rolling_goals'] = home_form_goals
-    df['away_rolling_goals'] = away_form_goals
-    df['home_rolling_xg'] = home_form_xg
-    df['away_rolling_xg'] = away_form_xg
+    n = len(df)
+
+    # Long team-match format: one entry per (match, side), home entries first
+    if 'home_team_id' in df.columns and 'away_team_id' in df.columns:
+        # Registry ids from ingest (team_registry); no string hashing needed
+        team_codes = np.concatenate([df['home_team_id'].to_numpy(), df['away_team_id'].to_numpy()])
+    else:
+        team_codes, _ = pd.factorize(pd.concat([df['home_team'], df['away_team']], ignore_index=True))
+    match_pos = np.concatenate([np.arange(n), np.arange(n)])
+    goals = np.concatenate([
+        pd.to_numeric(df['home_goals']).to_numpy(dtype=float),
+        pd.to_numeric(df['away_goals']).to_numpy(dtype=float),
+    ])
+    # Note: Scraper might return None for xG if missing
+    xg_cols = [df[c] if c in df.columns else pd.Series(np.nan, index=df.index) for c in ('home_xg', 'away_xg')]
+    xg = np.nan_to_num(np.concatenate([pd.to_numeric(c).to_numpy(dtype=float) for c in xg_cols]), nan=0.0)
+
+    # Group each team's matches together in chronological (row) order
+    order = np.lexsort((match_pos, team_codes))
+    sorted_teams = team_codes[order]
+    sorted_goals = goals[order]
+    sorted_xg = xg[order]
+
+    # Position of every entry inside its team's history
+    idx = np.arange(len(order))
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_teams)) + 1]
+    group_sizes = np.diff(np.r_[group_start, len(order)])
+    rank = idx - np.repeat(group_start, group_sizes)
+
+    # Sum the previous `window` values, oldest first (same order as the old loop)
+    goal_sums = np.zeros(len(order))
+    xg_sums = np.zeros(len(order))
+    for lag in range(window, 0, -1):
+        valid = rank >= lag
+        src = idx[valid] - lag
+        goal_sums[valid] += sorted_goals[src]
+        xg_sums[valid] += sorted_xg[src]
+
+    counts = np.minimum(rank, window)
+    safe_counts = np.maximum(counts, 1)
+    goal_avgs = np.where(counts > 0, goal_sums / safe_counts, 0.0)
+    xg_avgs = np.where(counts > 0, xg_sums / safe_counts, 0.0)
+
+    # Scatter back to (match, side) order
+    form_goals = np.empty(len(order))
+    form_xg = np.empty(len(order))
+    form_goals[order] = goal_avgs
+    form_xg[order] = xg_avgs
+
+    df['home_rolling_goals'] = form_goals[:n]
+    df['away_rolling_goals'] = form_goals[n:]
+    df['home_rolling_xg'] = form_xg[:n]
+    df['away_rolling_xg'] = form_xg[n:]
     
     return df
 
-def add_elo_ratings(df):
+def add_elo_ratings(df, rater=None):
     """
     Adds home_elo and away_elo columns to the dataframe.
+    Pass an existing rater to resume from its saved state.
     """
-    rater = EloRater()
-    home_elos = []
-    away_elos = []
+    if rater is None:
+        rater = EloRater()
     
     # Sort by date essential
     df = df.sort_values(by='date')
-    
-    for idx, row in df.iterrows():
-        # Get ratings BEFORE update
-        h_rating, a_rating = rater.update_ratings(
-            row['home_team'], 
-            row['away_team'], 
-            row['home_goals'], 
-            row['away_goals']
-        )
-        home_elos.append(h_rating)
-        away_elos.append(a_rating)
+
+    home_ids = rater.team_ids(df['home_team'])
+    away_ids = rater.team_ids(df['away_team'])
+
+    # Get ratings BEFORE each update
+    home_elos, away_elos = rater.replay(home_ids, away_ids, df['home_goals'], df['away_goals'])
         
     df['home_elo'] = home_elos
     df['away_elo'] = away_elos
     
     return df, rater
+
+class TeamFormIndex:
+    """
+    Per-team ring buffers of the last `window` goals and xG values.
+    Lets the predictor look up current form in O(1) instead of scanning history.
+    """
+    def __init__(self, window=5):
+        self.window = window
+        self.team_index = {} # dict: team_name -> row in the buffers
+        self.goals = np.zeros((0, window))
+        self.xg = np.zeros((0, window))
+        self.counts = np.zeros(0, dtype=np.int64) # matches seen per team
+
+    def _row(self, team):
+        idx = self.team_index.get(team)
+        if idx is None:
+            idx = len(self.team_index)
+            self.team_index[team] = idx
+            if idx >= len(self.counts):
+                # Grow buffers geometrically to keep appends amortized O(1)
+                new_size = max(8, 2 * len(self.counts))
+                pad = new_size - len(self.counts)
+                self.goals = np.vstack([self.goals, np.zeros((pad, self.window))])
+                self.xg = np.vstack([self.xg, np.zeros((pad, self.window))])
+                self.counts = np.concatenate([self.counts, np.zeros(pad, dtype=np.int64)])
+        return idx
+
+    def update(self, team, goals, xg):
+        """Records a played match for the team, overwriting its oldest entry."""
+        idx = self._row(team)
+        slot = self.counts[idx] % self.window
+        self.goals[idx, slot] = goals
+        self.xg[idx, slot] = 0.0 if pd.isna(xg) else xg
+        self.counts[idx] += 1
+
+    def get_form(self, team):
+        """Returns (avg_goals, avg_xg) over the team's last `window` matches."""
+        idx = self.team_index.get(team)
+        if idx is None or self.counts[idx] == 0:
+            return 0.0, 0.0 # Default if no history
+        n = min(self.counts[idx], self.window)
+        return float(self.goals[idx, :n].sum() / n), float(self.xg[idx, :n].sum() / n)
+
+    def ingest(self, df):
+        """
+        Adds rolling form columns for new matches (sorted by date) using the
+        current index state, then records each match. O(len(df)).
+        """
+        home_goals, away_goals, home_xg, away_xg = [], [], [], []
+        h_xgs = df['home_xg'] if 'home_xg' in df.columns else [0.0] * len(df)
+        a_xgs = df['away_xg'] if 'away_xg' in df.columns else [0.0] * len(df)
+        for h_team, a_team, h_g, a_g, h_xg, a_xg in zip(df['home_team'], df['away_team'],
+                                                        df['home_goals'], df['away_goals'], h_xgs, a_xgs):
+            # Get Stats BEFORE this match
+            form_h = self.get_form(h_team)
+            form_a = self.get_form(a_team)
+            home_goals.append(form_h[0])
+            home_xg.append(form_h[1])
+            away_goals.append(form_a[0])
+            away_xg.append(form_a[1])
+            # Update Stats AFTER this match
+            self.update(h_team, h_g, h_xg)
+            self.update(a_team, a_g, a_xg)
+
+        df['home_rolling_goals'] = home_goals
+        df['away_rolling_goals'] = away_goals
+        df['home_rolling_xg'] = home_xg
+        df['away_rolling_xg'] = away_xg
+        return df
+
+    @classmethod
+    def from_matches(cls, df, window=5):
+        """Builds the index from a frame of played matches (home/away goals and xG)."""
+        index = cls(window)
+        home_xg = df['home_xg'] if 'home_xg' in df.columns else pd.Series(0.0, index=df.index)
+        away_xg = df['away_xg'] if 'away_xg' in df.columns else pd.Series(0.0, index=df.index)
+        long_df = pd.DataFrame({
+            'team': pd.concat([df['home_team'], df['away_team']], ignore_index=True),
+            'date': pd.concat([df['date'], df['date']], ignore_index=True),
+            'goals': pd.concat([df['home_goals'], df['away_goals']], ignore_index=True),
+            'xg': pd.concat([home_xg, away_xg], ignore_index=True),
+        })
+        # Only the last `window` matches per team can end up in the buffers
+        recent = long_df.sort_values(by='date', kind='stable').groupby('team', sort=False, observed=True).tail(window)
+        for team, goals, xg in zip(recent['team'], recent['goals'], recent['xg']):
+            index.update(team, goals, xg)
+        return index
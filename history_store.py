@@ -0,0 +1,258 @@
+import argparse
+import bisect
+import contextlib
+import glob
+import json
+import os
+from datetime import datetime, timezone
+import utils_data
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Append-only history of every prediction and result.
+# Records are JSON lines in monthly segments (data/history/predictions-2025-01.jsonl);
+# a day saved with no records gets one marker line without a 'record', so the
+# segments alone describe every saved day. data/history/index.json maps match ids
+# and dates to byte offsets in the segments, so lookups read only the lines they need. Per-day files are still exported for the workflows.
+HISTORY_DIR = os.path.join(utils_data.DATA_DIR, "history")
+INDEX_PATH = os.path.join(HISTORY_DIR, "index.json")
+
+# Kind of record -> directory of the per-day export files
+KINDS = {
+    'predictions': utils_data.PREDICTIONS_DIR,
+    'results': utils_data.RESULTS_DIR,
+}
+
+def segment_name(kind, date_str):
+    return f"{kind}-{date_str[:7]}.jsonl"
+
+def record_id(record):
+    """Match id of a prediction ('id') or result entry ('match' -> 'id')."""
+    if 'id' in record:
+        return record['id']
+    return record.get('match', {}).get('id')
+
+def empty_index():
+    return {kind: {'ids': {}, 'dates': {}} for kind in KINDS}
+
+def load_index(path=INDEX_PATH):
+    index = utils_data.load_json(path)
+    if not index:
+        return empty_index()
+    for kind in KINDS:
+        index.setdefault(kind, {'ids': {}, 'dates': {}})
+    return index
+
+def save_index(index, path=INDEX_PATH):
+    # Sorted dates keep the file diff-friendly and make range scans a bisect
+    for kind in KINDS:
+        index[kind]['dates'] = dict(sorted(index[kind]['dates'].items()))
+    utils_data.write_atomic(path, json.dumps(index, separators=(',', ':')))
+
+@contextlib.contextmanager
+def locked(history_dir=HISTORY_DIR):
+    """
+    Holds an exclusive lock on the store while appending or re-indexing, so
+    overlapping jobs neither interleave segment offsets nor drop each other's
+    index entries. No-op where fcntl is unavailable.
+    """
+    os.makedirs(history_dir, exist_ok=True)
+    with open(os.path.join(history_dir, "index.lock"), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def append_day(kind, date_str, records, history_dir=HISTORY_DIR):
+    """
+    Appends a day's records to its segment and points the index at them.
+    Writing the same day again appends a new copy; the index then serves the latest one.
+    """
+    with locked(history_dir):
+        return _append_day(kind, date_str, records, history_dir)
+
+def _append_day(kind, date_str, records, history_dir):
+    index_path = os.path.join(history_dir, "index.json")
+    index = load_index(index_path)
+
+    segment = segment_name(kind, date_str)
+    batch = datetime.now(timezone.utc).isoformat()
+    lines = [json.dumps({'date': date_str, 'batch': batch, 'record': record}, separators=(',', ':')).encode('utf-8') + b"\n"
+             for record in records]
+    marker = [json.dumps({'date': date_str, 'batch': batch}, separators=(',', ':')).encode('utf-8') + b"\n"]
+
+    locations = []
+    with open(os.path.join(history_dir, segment), 'ab') as f:
+        offset = f.tell()
+        for line in lines:
+            locations.append([segment, offset, len(line)])
+            offset += len(line)
+        # One write + fsync per day, before the index references the new lines
+        f.write(b"".join(lines or marker))
+        f.flush()
+        os.fsync(f.fileno())
+
+    kind_index = index[kind]
+    for record, location in zip(records, locations):
+        match_id = record_id(record)
+        if match_id:
+            kind_index['ids'][match_id] = location
+    kind_index['dates'][date_str] = locations
+    save_index(index, index_path)
+    return len(records)
+
+def _read(locations, history_dir=HISTORY_DIR):
+    """Reads the records at (segment, offset, length) locations, grouped by segment."""
+    records = []
+    handles = {}
+    try:
+        for segment, offset, length in locations:
+            if segment not in handles:
+                handles[segment] = open(os.path.join(history_dir, segment), 'rb')
+            f = handles[segment]
+            f.seek(offset)
+            records.append(json.loads(f.read(length))['record'])
+    finally:
+        for f in handles.values():
+            f.close()
+    return records
+
+def get_day(kind, date_str, history_dir=HISTORY_DIR):
+    """Returns the latest records saved for a date, or None if the date was never saved."""
+    locations = load_index(os.path.join(history_dir, "index.json"))[kind]['dates'].get(date_str)
+    if locations is None:
+        return None
+    return _read(locations, history_dir)
+
+def get_record(kind, match_id, history_dir=HISTORY_DIR):
+    """Looks up the latest record of a match id (utils_data.generate_match_id)."""
+    location = load_index(os.path.join(history_dir, "index.json"))[kind]['ids'].get(match_id)
+    if location is None:
+        return None
+    return _read([location], history_dir)[0]
+
+def get_range(kind, start_date, end_date, history_dir=HISTORY_DIR):
+    """Returns {date: records} for every saved date in [start_date, end_date] (YYYY-MM-DD)."""
+    dates_index = load_index(os.path.join(history_dir, "index.json"))[kind]['dates']
+    dates = sorted(dates_index)
+    selected = dates[bisect.bisect_left(dates, start_date):bisect.bisect_right(dates, end_date)]
+    return {date_str: _read(dates_index[date_str], history_dir) for date_str in selected}
+
+def iter_days(kind, history_dir=HISTORY_DIR):
+    """Yields (date, records) for every saved date, oldest first."""
+    dates_index = load_index(os.path.join(history_dir, "index.json"))[kind]['dates']
+    for date_str in sorted(dates_index):
+        yield date_str, _read(dates_index[date_str], history_dir)
+
+def export_day(kind, date_str, records, path=None):
+    """Writes the per-day JSON file the GitHub workflows commit."""
+    if path is None:
+        path = os.path.join(KINDS[kind], f"{date_str}.json")
+    utils_data.save_json(records, path)
+
+def save_day(kind, date_str, records, path=None, history_dir=HISTORY_DIR):
+    """Appends a day to the history store and exports its per-day file."""
+    try:
+        append_day(kind, date_str, records, history_dir)
+    except Exception as e:
+        print(f"Error appending {kind} for {date_str} to the history store: {e}")
+    export_day(kind, date_str, records, path)
+
+def day_files(kind):
+    """Returns (date, path) for every per-day file of a kind."""
+    return [(os.path.basename(path)[:-len(".json")], path)
+            for path in sorted(glob.glob(os.path.join(KINDS[kind], "*.json")))]
+
+def migrate(history_dir=HISTORY_DIR):
+    """
+    One-shot import of the existing per-day files into the store.
+    Dates already in the store are skipped, so it is safe to re-run. Empty days are
+    recorded like the live jobs record them; unreadable files are skipped.
+    """
+    imported = 0
+    for kind in KINDS:
+        known = load_index(os.path.join(history_dir, "index.json"))[kind]['dates']
+        for date_str, path in day_files(kind):
+            if date_str in known:
+                continue
+            records = utils_data.load_json(path)
+            if records is None:
+                continue
+            append_day(kind, date_str, records, history_dir)
+            imported += 1
+    print(f"Migrated {imported} per-day files into {history_dir}.")
+    return imported
+
+def rebuild_index(history_dir=HISTORY_DIR):
+    """Recreates index.json by scanning every segment (latest batch of each date wins)."""
+    with locked(history_dir):
+        index = _scan_segments(history_dir)
+        save_index(index, os.path.join(history_dir, "index.json"))
+    print("Rebuilt history index.")
+    return index
+
+def _scan_segments(history_dir):
+    index = empty_index()
+    for kind in KINDS:
+        latest = {}
+        for segment_path in sorted(glob.glob(os.path.join(history_dir, f"{kind}-*.jsonl"))):
+            segment = os.path.basename(segment_path)
+            offset = 0
+            with open(segment_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write at the end of the segment
+                    entry = json.loads(line)
+                    day = latest.get(entry['date'])
+                    if day is None or day[0] != entry['batch']:
+                        day = latest[entry['date']] = (entry['batch'], [])
+                    if 'record' in entry: # Otherwise an empty day's marker
+                        day[1].append(([segment, offset, len(line)], record_id(entry['record'])))
+                    offset += len(line)
+        for date_str, (_, located) in latest.items():
+            index[kind]['dates'][date_str] = [location for location, _ in located]
+            for location, match_id in located:
+                if match_id:
+                    index[kind]['ids'][match_id] = location
+    os.makedirs(history_dir, exist_ok=True)
+    save_index(index, os.path.join(history_dir, "index.json"))
+    print("Rebuilt history index.")
+    return index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prediction / result history store")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('migrate', help="Import the existing per-day files")
+    sub.add_parser('rebuild-index', help="Recreate index.json from the segments")
+    get_parser = sub.add_parser('get', help="Look up a match id")
+    get_parser.add_argument('match_id')
+    get_parser.add_argument('--kind', choices=list(KINDS), default='predictions')
+    range_parser = sub.add_parser('range', help="Print records between two dates (YYYY-MM-DD)")
+    range_parser.add_argument('start')
+    range_parser.add_argument('end')
+    range_parser.add_argument('--kind', choices=list(KINDS), default='predictions')
+    export_parser = sub.add_parser('export', help="Re-export a date's per-day file")
+    export_parser.add_argument('date')
+    export_parser.add_argument('--kind', choices=list(KINDS), default='predictions')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate()
+    elif args.command == 'rebuild-index':
+        rebuild_index()
+    elif args.command == 'get':
+        print(json.dumps(get_record(args.kind, args.match_id), indent=4))
+    elif args.command == 'range':
+        print(json.dumps(get_range(args.kind, args.start, args.end), indent=4))
+    elif args.command == 'export':
+        records = get_day(args.kind, args.date)
+        if records is None:
+            print(f"No {args.kind} saved for {args.date}.")
+        else:
+            export_day(args.kind, args.date, records)
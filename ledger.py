@@ -0,0 +1,167 @@
+import argparse
+import math
+import os
+from datetime import datetime, timezone
+import history_store
+import utils_data
+
+# Running accuracy aggregate over every day of results (data/results/<date>.json).
+# Only the aggregates and the list of recorded dates are kept; re-running a day
+# subtracts its previously stored results (O(that day's matches)) before adding the new ones.
+LEDGER_PATH = os.path.join(utils_data.DATA_DIR, "ledger.json")
+
+STAT_KEYS = ('correct', 'incorrect', 'pending', 'scored', 'brier_sum', 'log_loss_sum')
+
+def empty_stats():
+    return {key: 0 for key in STAT_KEYS}
+
+def empty_ledger():
+    return {'updated_at': None, 'totals': empty_stats(), 'by_team': {}, 'by_month': {}, 'days': []}
+
+def _outcome_probs(prediction):
+    """Returns (p_home, p_draw, p_away) of a prediction, or None if it has none."""
+    try:
+        return float(prediction['prob_home']), float(prediction['prob_draw']), float(prediction['prob_away'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def result_stats(entry):
+    """Stats contribution of one result entry (as written by the evening job)."""
+    stats = empty_stats()
+    status = entry.get('status')
+    if status == 'CORRECT':
+        stats['correct'] = 1
+    elif status == 'INCORRECT':
+        stats['incorrect'] = 1
+    else:
+        stats['pending'] = 1
+        return stats
+
+    probs = _outcome_probs(entry['match'].get('prediction', {}))
+    actual = entry.get('actual') or {}
+    if probs is not None and 'home_goals' in actual:
+        hg, ag = actual['home_goals'], actual['away_goals']
+        outcome = 0 if hg > ag else (1 if hg == ag else 2)
+        stats['scored'] = 1
+        stats['brier_sum'] = sum((p - (i == outcome)) ** 2 for i, p in enumerate(probs))
+        stats['log_loss_sum'] = -math.log(min(max(probs[outcome], 1e-15), 1.0))
+    return stats
+
+def _add(target, stats, sign=1):
+    for key in STAT_KEYS:
+        target[key] = target.get(key, 0) + sign * stats[key]
+
+def day_contribution(results):
+    """Aggregates one day's result entries into totals, per-team and per-month stats."""
+    day = {'totals': empty_stats(), 'by_team': {}, 'by_month': {}}
+    for entry in results or []:
+        match = entry['match']
+        stats = result_stats(entry)
+        _add(day['totals'], stats)
+        for team in (match['home_team'], match['away_team']):
+            _add(day['by_team'].setdefault(team, empty_stats()), stats)
+        _add(day['by_month'].setdefault(str(match['date'])[:7], empty_stats()), stats)
+    return day
+
+def _apply(ledger, day, sign):
+    _add(ledger['totals'], day['totals'], sign)
+    for group in ('by_team', 'by_month'):
+        for key, stats in day[group].items():
+            bucket = ledger[group].setdefault(key, empty_stats())
+            _add(bucket, stats, sign)
+            if sign < 0 and not any(bucket[k] for k in ('correct', 'incorrect', 'pending')):
+                del ledger[group][key]
+
+def stored_results(date_str):
+    """A day's results as currently saved (history store, else the per-day file)."""
+    results = history_store.get_day('results', date_str)
+    if results is None:
+        results = utils_data.load_json(utils_data.get_result_file_path(date_str))
+    return results
+
+def record_day(ledger, date_str, results, previous=None):
+    """
+    Adds (or replaces) a day's results in the ledger; only touches that day's matches.
+    previous: the results the ledger already counted for this date (default: the
+    stored ones, so call this before saving the new results).
+    """
+    if date_str in ledger['days']:
+        if previous is None:
+            previous = stored_results(date_str)
+        if previous:
+            _apply(ledger, day_contribution(previous), -1)
+    else:
+        ledger['days'].append(date_str)
+        ledger['days'].sort()
+    _apply(ledger, day_contribution(results), 1)
+    return ledger
+
+def summarize(stats):
+    """Adds the derived accuracy / mean Brier / mean log-loss to a stats dict."""
+    decided = stats['correct'] + stats['incorrect']
+    summary = dict(stats)
+    summary['accuracy'] = round(stats['correct'] / decided, 4) if decided else None
+    summary['brier'] = round(stats['brier_sum'] / stats['scored'], 4) if stats['scored'] else None
+    summary['log_loss'] = round(stats['log_loss_sum'] / stats['scored'], 4) if stats['scored'] else None
+    return summary
+
+def load_ledger(path=LEDGER_PATH):
+    ledger = utils_data.load_json(path)
+    if not ledger or 'days' not in ledger:
+        return empty_ledger()
+    # Derived fields are recomputed on save
+    ledger['totals'] = {key: ledger['totals'][key] for key in STAT_KEYS}
+    for group in ('by_team', 'by_month'):
+        ledger[group] = {k: {key: v[key] for key in STAT_KEYS} for k, v in ledger[group].items()}
+    return ledger
+
+def save_ledger(ledger, path=LEDGER_PATH):
+    ledger['updated_at'] = datetime.now(timezone.utc).isoformat()
+    output = dict(ledger)
+    output['totals'] = summarize(ledger['totals'])
+    for group in ('by_team', 'by_month'):
+        output[group] = {k: summarize(v) for k, v in sorted(ledger[group].items())}
+    utils_data.save_json(output, path)
+
+def update(date_str, results, path=LEDGER_PATH):
+    """
+    Evening job hook: folds today's results into the saved ledger.
+    Runs before the results are saved, so a re-run can subtract the stored ones.
+    """
+    ledger = record_day(load_ledger(path), date_str, results)
+    save_ledger(ledger, path)
+    return ledger
+
+def rebuild(path=LEDGER_PATH):
+    """
+    Rebuilds the ledger from scratch in one pass over the history store, plus
+    any per-day result files the store does not hold yet.
+    """
+    ledger = empty_ledger()
+    days = dict(history_store.iter_days('results'))
+    for date_str, file_path in history_store.day_files('results'):
+        if date_str not in days:
+            days[date_str] = utils_data.load_json(file_path)
+    for date_str in sorted(days):
+        record_day(ledger, date_str, days[date_str])
+    save_ledger(ledger, path)
+    print(f"Rebuilt ledger from {len(days)} days of results.")
+    return ledger
+
+def print_summary(ledger):
+    totals = summarize(ledger['totals'])
+    print(f"Correct: {totals['correct']}  Incorrect: {totals['incorrect']}  Pending: {totals['pending']}")
+    if totals['accuracy'] is not None:
+        print(f"Accuracy: {totals['accuracy'] * 100:.1f}%")
+    if totals['brier'] is not None:
+        print(f"Brier score: {totals['brier']:.4f}  Log-loss: {totals['log_loss']:.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy ledger over the daily result files")
+    parser.add_argument('command', choices=['rebuild', 'show'], help="Rebuild from data/results, or show totals")
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        print_summary(rebuild())
+    else:
+        print_summary(load_ledger())
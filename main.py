@@ -1,8 +1,8 @@
 import sys
-from fbref_scraper import scrape_data
-import utils
+import match_store
+import team_registry
 from match_manager import display_matches, get_match_by_index, filter_by_gameweek
-from predictor import predict_match
+from prediction_server import predict_match
 import config
 
 def main():
@@ -10,9 +10,9 @@ def main():
     print("Fetching upcoming fixtures from FBRef...")
 
     try:
-        # Step 1: Fetch Data (Scraper)
+        # Step 1: Fetch Data (Scraper -> local match store)
         # We only need 'upcoming' for the main app flow here
-        _, upcoming_df = scrape_data()
+        _, upcoming_df = match_store.load_fixtures(league_id=config.LEAGUE_ID)
         
         if upcoming_df.empty:
             print("No upcoming matches found.")
@@ -20,11 +20,12 @@ def main():
 
         # Step 2: Process Data
         # Convert DataFrame to list of dicts for the existing app flow
+        registry = team_registry.get_registry()
         upcoming_matches = []
         for _, row in upcoming_df.iterrows():
             upcoming_matches.append({
-                'home_team': utils.normalize_team_name(row['Home']),
-                'away_team': utils.normalize_team_name(row['Away']),
+                'home_team': registry.canonical(row['Home']),
+                'away_team': registry.canonical(row['Away']),
                 'date': row['Date'], # pandas timestamp
                 'time': row.get('Time', 'Unknown'),
                 'gameweek': row.get('gameweek', 'Unknown')
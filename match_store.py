@@ -0,0 +1,229 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+import pandas as pd
+import config
+import metrics
+import team_registry
+import utils_data
+
+# Local SQLite store of every scraped fixture and result, keyed by match id.
+# One scrape feeds main.py, the automation jobs and training.
+DB_PATH = os.path.join("data", "matches.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id   TEXT PRIMARY KEY,
+    date       TEXT NOT NULL,
+    time       TEXT,
+    gameweek   INTEGER,
+    home_team  TEXT NOT NULL,
+    away_team  TEXT NOT NULL,
+    score      TEXT,
+    home_goals INTEGER,
+    away_goals INTEGER,
+    home_xg    REAL,
+    away_xg    REAL,
+    league_id  INTEGER,
+    season     INTEGER,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (date);
+CREATE INDEX IF NOT EXISTS idx_matches_home ON matches (home_team, date);
+CREATE INDEX IF NOT EXISTS idx_matches_away ON matches (away_team, date);
+CREATE INDEX IF NOT EXISTS idx_matches_league ON matches (league_id, season, date);
+"""
+
+# Store columns -> scraper-style column names used by the rest of the app
+COLUMN_MAP = {
+    'date': 'Date',
+    'time': 'Time',
+    'gameweek': 'gameweek',
+    'home_team': 'Home',
+    'away_team': 'Away',
+    'score': 'Score',
+    'home_goals': 'HomeGoals',
+    'away_goals': 'AwayGoals',
+    'home_xg': 'home_xg',
+    'away_xg': 'away_xg',
+    'league_id': 'league_id',
+    'season': 'season',
+}
+
+def connect(path=DB_PATH):
+    """Opens the store, creating the schema if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _none_if_na(value):
+    return None if pd.isna(value) else value
+
+def upsert_matches(df, path=DB_PATH, league_season=None):
+    """
+    Inserts or updates scraped fixtures (scraper column names) by match id.
+    league_season: (league_id, season) the frame is a complete scrape of; unplayed
+    fixtures of that season it no longer lists (rescheduled to a new date, which
+    means a new match id) are deleted. Returns the number of rows written.
+    """
+    if df is None or df.empty:
+        return 0
+
+    df = df.dropna(subset=['Date'])
+    # Ingest is where teams are registered; each distinct name is mapped once
+    registry = team_registry.get_registry()
+    home = registry.names(registry.ids(df['Home']))
+    away = registry.names(registry.ids(df['Away']))
+    registry.save()
+    dates = df['Date'].dt.strftime('%Y-%m-%d')
+    now = datetime.now(timezone.utc).isoformat()
+
+    def column(name):
+        return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    rows = []
+    for date, h, a, time_, gw, score, hg, ag, hxg, axg, league_id, season in zip(
+            dates, home, away, column('Time'), column('gameweek'), column('Score'),
+            column('HomeGoals'), column('AwayGoals'), column('home_xg'), column('away_xg'),
+            column('league_id'), column('season')):
+        rows.append((
+            utils_data.generate_match_id(date, h, a), date, _none_if_na(time_),
+            None if pd.isna(gw) else int(gw), h, a, _none_if_na(score),
+            None if pd.isna(hg) else int(hg), None if pd.isna(ag) else int(ag),
+            None if pd.isna(hxg) else float(hxg), None if pd.isna(axg) else float(axg),
+            None if pd.isna(league_id) else int(league_id), None if pd.isna(season) else int(season),
+            now,
+        ))
+
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT INTO matches (match_id, date, time, gameweek, home_team, away_team, score,
+                                     home_goals, away_goals, home_xg, away_xg, league_id, season, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(match_id) DO UPDATE SET
+                    date = excluded.date, time = excluded.time, gameweek = excluded.gameweek,
+                    score = excluded.score, home_goals = excluded.home_goals,
+                    away_goals = excluded.away_goals, home_xg = excluded.home_xg,
+                    away_xg = excluded.away_xg,
+                    league_id = COALESCE(excluded.league_id, matches.league_id),
+                    season = COALESCE(excluded.season, matches.season),
+                    updated_at = excluded.updated_at
+            """, rows)
+            if league_season is not None:
+                # Every row in this scrape was just stamped with `now`
+                deleted = conn.execute("""
+                    DELETE FROM matches
+                    WHERE league_id = ? AND season = ? AND home_goals IS NULL AND updated_at < ?
+                """, (league_season[0], league_season[1], now)).rowcount
+                if deleted:
+                    print(f"Removed {deleted} rescheduled fixtures no longer listed for league {league_season[0]} season {league_season[1]}.")
+    finally:
+        conn.close()
+    return len(rows)
+
+def refresh(targets=None, path=DB_PATH, **scrape_kwargs):
+    """
+    Scrapes FBref once per (league_id, season) target (config.SCRAPE_TARGETS by
+    default), concurrently, and upserts every fixture into the store.
+    """
+    from fbref_scraper import scrape_many
+    if targets is None:
+        targets = config.SCRAPE_TARGETS
+
+    written = 0
+    for (league_id, season), df in scrape_many(targets, **scrape_kwargs).items():
+        with metrics.span('store.upsert'):
+            written += upsert_matches(df, path, league_season=(league_id, season))
+    metrics.incr('fixtures_upserted', written)
+    print(f"Match store updated with {written} fixtures.")
+    return written
+
+def query(where="", params=(), order_by="date, time", path=DB_PATH):
+    """Runs an indexed SELECT against the store and returns a scraper-style DataFrame."""
+    sql = "SELECT match_id, " + ", ".join(COLUMN_MAP) + " FROM matches"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+
+    conn = connect(path)
+    try:
+        df = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+    df = df.rename(columns=COLUMN_MAP)
+    df['Date'] = pd.to_datetime(df['Date'])
+    # Team columns come back as registry categoricals with int team id columns
+    team_registry.encode(df, {'Home': 'home_team_id', 'Away': 'away_team_id'})
+    for col in ('gameweek', 'league_id', 'season'):
+        df[col] = df[col].astype('Int64')
+    for col in ('HomeGoals', 'AwayGoals', 'home_xg', 'away_xg'):
+        df[col] = pd.to_numeric(df[col]).astype(float)
+    return df
+
+def _league_filter(where, params, league_id):
+    if league_id is None:
+        return where, params
+    return f"({where}) AND league_id = ?", tuple(params) + (league_id,)
+
+def load_fixtures(refresh_first=True, league_id=None, path=DB_PATH):
+    """
+    Returns (completed_df, upcoming_df) from the store, in the same shape as
+    fbref_scraper.scrape_data. Refreshes from FBref first unless told not to.
+    league_id limits the result to one league (default: every tracked league).
+    """
+    if refresh_first:
+        refresh(path=path)
+
+    today = pd.Timestamp.now().strftime('%Y-%m-%d')
+    completed = query(*_league_filter("home_goals IS NOT NULL AND away_goals IS NOT NULL", (), league_id), path=path)
+    upcoming = query(*_league_filter("home_goals IS NULL AND date >= ?", (today,), league_id), path=path)
+    print(f"Loaded {len(completed)} completed matches and {len(upcoming)} upcoming fixtures from the match store.")
+    return completed, upcoming
+
+def get_matches_on(date_str, completed=None, league_id=None, path=DB_PATH):
+    """Returns fixtures on a YYYY-MM-DD date; completed=True/False filters by result."""
+    where = "date = ?"
+    if completed is True:
+        where += " AND home_goals IS NOT NULL"
+    elif completed is False:
+        where += " AND home_goals IS NULL"
+    return query(*_league_filter(where, (date_str,), league_id), path=path)
+
+def get_matches_by_ids(match_ids, path=DB_PATH):
+    """Looks up fixtures by match id (primary key)."""
+    match_ids = list(match_ids)
+    if not match_ids:
+        return query("0", path=path)
+    placeholders = ", ".join("?" * len(match_ids))
+    return query(f"match_id IN ({placeholders})", tuple(match_ids), path=path)
+
+def get_team_matches(team, limit=None, path=DB_PATH):
+    """Returns a team's completed matches, most recent last."""
+    team = team_registry.get_registry().canonical(team)
+    where = "(home_team = ? OR away_team = ?) AND home_goals IS NOT NULL"
+    df = query(where, (team, team), order_by="date DESC", path=path)
+    if limit:
+        df = df.head(limit)
+    return df.iloc[::-1].reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill / refresh the local match store")
+    parser.add_argument('--leagues', type=int, nargs='+', default=[config.LEAGUE_ID],
+                        help="League ids to scrape (default: config.LEAGUE_ID)")
+    parser.add_argument('--seasons', type=int, nargs='+', default=[config.SEASON],
+                        help="Season start years to scrape (default: config.SEASON)")
+    parser.add_argument('--workers', type=int, default=config.SCRAPE_MAX_WORKERS,
+                        help="Concurrent scraper workers")
+    args = parser.parse_args()
+
+    refresh([(league, season) for league in args.leagues for season in args.seasons],
+            max_workers=args.workers)
@@ -0,0 +1,147 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import utils_data
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# One record per job run: data/metrics/<job>/<date>.json
+METRICS_DIR = os.path.join(utils_data.DATA_DIR, "metrics")
+
+# Set PREDICTOR_PROFILE=1 (or pass --profile to automation.py) to dump cProfile stats
+PROFILE_ENV = "PREDICTOR_PROFILE"
+
+class MetricsRecorder:
+    """
+    Collects timing spans, counters and values for one job run.
+    Thread-safe, so scraper worker threads can report into the same recorder.
+    """
+    def __init__(self, job):
+        self.job = job
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+        self.values = {}
+
+    @contextmanager
+    def span(self, name):
+        """Times the enclosed block; repeated spans with the same name are summed."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.spans.setdefault(name, {'count': 0, 'seconds': 0.0})
+                entry['count'] += 1
+                entry['seconds'] += elapsed
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_value(self, name, value):
+        with self._lock:
+            self.values[name] = value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job': self.job,
+                'started_at': self.started_at.isoformat(),
+                'duration_s': round(time.perf_counter() - self._start, 6),
+                'peak_rss_mb': peak_rss_mb(),
+                'spans': {name: {'count': s['count'], 'seconds': round(s['seconds'], 6)}
+                          for name, s in self.spans.items()},
+                'counters': dict(self.counters),
+                'values': dict(self.values),
+            }
+
+# Recorder of the job currently running (None outside automation jobs)
+_current = None
+
+def start(job):
+    """Starts recording metrics for a job and makes it the current recorder."""
+    global _current
+    _current = MetricsRecorder(job)
+    return _current
+
+def current():
+    return _current
+
+@contextmanager
+def span(name):
+    """Times a stage in the current job; a no-op when nothing is recording."""
+    if _current is None:
+        yield
+        return
+    with _current.span(name):
+        yield
+
+def incr(name, amount=1):
+    """Increments a counter in the current job, if any."""
+    if _current is not None:
+        _current.incr(name, amount)
+
+def set_value(name, value):
+    """Records a value (e.g. artifact load timings) in the current job, if any."""
+    if _current is not None:
+        _current.set_value(name, value)
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 2)
+
+def metrics_path(job, date_str):
+    """Metrics file of a job run: data/metrics/morning/2025-01-01.json"""
+    return os.path.join(METRICS_DIR, job, f"{date_str}.json")
+
+def finish(date_str):
+    """Stops recording and saves the metrics of the day's run."""
+    global _current
+    recorder, _current = _current, None
+    if recorder is None:
+        return None
+    record = recorder.to_dict()
+    path = metrics_path(recorder.job, date_str)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    utils_data.save_json(record, path)
+    return record
+
+def profiling_enabled():
+    return os.getenv(PROFILE_ENV, "") not in ("", "0")
+
+@contextmanager
+def profile(path, enabled=None):
+    """Runs the block under cProfile and dumps the stats to `path` when enabled."""
+    if enabled is None:
+        enabled = profiling_enabled()
+    if not enabled:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        try:
+            profiler.dump_stats(path)
+            print(f"Saved profile to {path} (view with: python -m pstats {path})")
+        except Exception as e:
+            print(f"Error saving profile to {path}: {e}")
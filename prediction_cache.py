@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import utils_data
+
+# Content hashes of artifact files, memoized by (path, mtime, size) so an
+# unchanged file is only read once per process
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents (memoized while its mtime and size are unchanged)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_hashes_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+def combine_hashes(hashes):
+    """One version string for a set of named artifact hashes."""
+    digest = hashlib.sha256()
+    for name in sorted(hashes):
+        digest.update(f"{name}={hashes[name]};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def make_key(version, match_id):
+    """Cache key: the fixture's match id under one artifact version."""
+    return f"{version}:{match_id}"
+
+class PredictionCache:
+    """
+    In-memory LRU cache of prediction dicts, optionally persisted to a JSON file.
+    Keys include the artifact version, so retraining makes old entries unreachable
+    (they age out of the LRU instead of being served).
+    """
+    def __init__(self, max_size=4096, path=None, save_interval=30, save_every=256):
+        self.max_size = max_size
+        self.path = path
+        self.save_interval = save_interval
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._unsaved = 0 # puts since the last save
+        self._last_save = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            self._unsaved += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def load(self):
+        """Reads persisted entries (least recently used first), if the file exists."""
+        data = utils_data.load_json(self.path)
+        if not data:
+            return
+        with self._lock:
+            for key, value in data.get('entries', []):
+                self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def maybe_save(self):
+        """Saves if enough entries were added or enough time passed since the last save."""
+        with self._lock:
+            due = (self._unsaved >= self.save_every
+                   or time.monotonic() - self._last_save >= self.save_interval)
+        if due:
+            self.save()
+
+    def save(self):
+        """Writes the entries to disk if anything changed since the last save."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'entries': list(self._entries.items())}, separators=(',', ':'))
+            self._dirty = False
+            self._unsaved = 0
+            self._last_save = time.monotonic()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            utils_data.write_atomic(self.path, payload)
+        except Exception as e:
+            print(f"Error saving prediction cache to {self.path}: {e}")
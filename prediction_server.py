@@ -0,0 +1,161 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import error, request
+import config
+import metrics
+
+# Local HTTP/JSON prediction service. The server keeps the models resident so each
+# prediction costs milliseconds instead of a cold start. Clients (main.py,
+# automation.py) use the client functions below; the predictor and the models are
+# only imported on the server, or when a client falls back to predicting locally.
+#
+#   GET  /health         -> status, artifact load timings, request counters and latency
+#   POST /predict        -> {"home_team": ..., "away_team": ..., "date": ...} -> prediction dict
+#   POST /predict/batch  -> {"matches": [{...}, ...]} -> {"predictions": [...]}
+
+MAX_BODY_BYTES = 1024 * 1024
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server_version = "FootballPredictor/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise ValueError("Request body must be JSON (at most 1 MB)")
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+        import predictor
+        self._send_json(200, {
+            'status': 'ok',
+            'engine': predictor.context.engine,
+            'models_loaded': predictor.context.is_ready(),
+            'artifact_load_s': predictor.context.load_timings,
+            'prediction_cache': predictor.cache_stats(),
+            'metrics': self.server.recorder.to_dict(),
+        })
+
+    def do_POST(self):
+        import predictor
+        path = self.path.rstrip("/")
+        if path not in ("/predict", "/predict/batch"):
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+
+        recorder = self.server.recorder
+        try:
+            payload = self._read_json()
+            matches = payload.get('matches') if path == "/predict/batch" else [payload]
+            matches = [_fixture(m) for m in matches]
+        except Exception as e:
+            recorder.incr('errors')
+            self._send_json(400, {'error': f"Bad request: {e}"})
+            return
+
+        with recorder.span(path):
+            predictions = predictor.predict_matches(matches)
+        recorder.incr('requests')
+        recorder.incr('predictions', len(predictions))
+
+        if path == "/predict":
+            self._send_json(200, predictions[0])
+        else:
+            self._send_json(200, {'predictions': predictions})
+
+    def log_message(self, format, *args):
+        # Per-request access logs would drown the console; counters are on /health
+        pass
+
+def _fixture(match):
+    """Validates one fixture from a request: team names, plus the date when given (part of the match id)."""
+    if not isinstance(match, dict) or not match.get('home_team') or not match.get('away_team'):
+        raise ValueError("each match needs 'home_team' and 'away_team'")
+    fixture = {'home_team': str(match['home_team']), 'away_team': str(match['away_team'])}
+    if match.get('date') is not None:
+        # str() keeps the YYYY-MM-DD prefix generate_match_id uses (Timestamps included)
+        fixture['date'] = str(match['date'])
+    return fixture
+
+def serve(host=config.PREDICTION_SERVER_HOST, port=config.PREDICTION_SERVER_PORT, engine=None):
+    """Loads the models once and serves predictions until interrupted."""
+    import predictor
+    if engine:
+        predictor.set_engine(engine)
+    predictor.warm_up()
+
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.daemon_threads = True
+    server.recorder = metrics.MetricsRecorder('prediction_server')
+    print(f"Prediction server ({predictor.context.engine} engine) listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down prediction server.")
+    finally:
+        server.server_close()
+        predictor.cache.save()
+
+# --- Client ---
+
+def server_url(url=None):
+    return (url or config.PREDICTION_SERVER_URL or "").rstrip("/")
+
+def _call(url, path, payload=None, timeout=config.PREDICTION_SERVER_TIMEOUT):
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    req = request.Request(url + path, data=data, headers={"Content-Type": "application/json"})
+    with request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def server_available(url=None, timeout=2):
+    """True if a prediction server is configured and answers /health."""
+    url = server_url(url)
+    if not url:
+        return False
+    try:
+        return _call(url, "/health", timeout=timeout).get('status') == 'ok'
+    except (error.URLError, OSError, ValueError):
+        return False
+
+def predict_matches(matches, url=None):
+    """
+    Predicts fixtures on the prediction server if one is configured
+    (config.PREDICTION_SERVER_URL or `url`), else / on failure in-process.
+    """
+    url = server_url(url)
+    if url:
+        try:
+            start = time.perf_counter()
+            response = _call(url, "/predict/batch", {'matches': [_fixture(m) for m in matches]})
+            print(f"Predicted {len(matches)} matches on {url} in {(time.perf_counter() - start) * 1000:.1f}ms.")
+            return response['predictions']
+        except Exception as e:
+            print(f"Prediction server unavailable ({e}). Predicting locally.")
+
+    import predictor
+    return predictor.predict_matches(matches)
+
+def predict_match(match_data, url=None):
+    """Single-fixture version of predict_matches."""
+    return predict_matches([match_data], url)[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve predictions over HTTP with the models kept in memory")
+    parser.add_argument('--host', default=config.PREDICTION_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=config.PREDICTION_SERVER_PORT)
+    parser.add_argument('--engine', choices=['forest', 'dixon_coles'], default=None,
+                        help="Prediction engine (default: config.PREDICTION_ENGINE)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.engine)
@@ -1,108 +1,327 @@
 import joblib
 import pandas as pd
+import numpy as np
 import os
 import random
-import utils
+import utils_data
 import features
+import config
+import prediction_cache
+import team_registry
+import feature_store
+from team_registry import TeamCodeLookup
+from dixon_coles import DixonColesModel
+import atexit
 import math
+import threading
+import time
 
-# Load models if they exist
+# Artifacts are loaded lazily on first use (see ModelContext)
 MODEL_PATH_HOME = 'model_home.pkl'
 MODEL_PATH_AWAY = 'model_away.pkl'
 ENCODER_PATH = 'team_encoder.pkl'
 ELO_PATH = 'elo_state.pkl'
 TRAINING_DATA_PATH = 'training_data.pkl'
+TEAM_FORM_PATH = 'team_form.pkl'
+# Columns of the training feature store needed to rebuild the form index
+FORM_COLUMNS = ['date', 'home_team', 'away_team', 'home_goals', 'away_goals', 'home_xg', 'away_xg']
+# Compiled artifacts exported by train_model (preferred; no sklearn needed to load them)
+FOREST_PATH_HOME = 'forest_home.npz'
+FOREST_PATH_AWAY = 'forest_away.npz'
+ENCODER_CLASSES_PATH = 'team_encoder_classes.npy'
+# Dixon-Coles attack/defence model (engine 'dixon_coles')
+DIXON_COLES_PATH = 'dixon_coles.json'
 
-model_home = None
-model_away = None
-encoder = None
-elo_state = None
-training_df = None
-
-try:
-    if os.path.exists(MODEL_PATH_HOME):
-        model_home = joblib.load(MODEL_PATH_HOME)
-    if os.path.exists(MODEL_PATH_AWAY):
-        model_away = joblib.load(MODEL_PATH_AWAY)
-    if os.path.exists(ENCODER_PATH):
-        encoder = joblib.load(ENCODER_PATH)
-    if os.path.exists(ELO_PATH):
-        elo_state = joblib.load(ELO_PATH)
-    if os.path.exists(TRAINING_DATA_PATH):
-        training_df = joblib.load(TRAINING_DATA_PATH)
-        
-except Exception as e:
-    print(f"Error loading models: {e}")
+# Prediction engines and the artifacts each one needs
+ENGINE_ARTIFACTS = {
+    'forest': ('model_home', 'model_away', 'encoder', 'elo_state', 'team_form'),
+    'dixon_coles': ('dixon_coles',),
+}
+
+class FlatForest:
+    """
+    A RandomForestRegressor flattened into NumPy node arrays
+    (feature, threshold, left/right children, leaf value) by train_model.export_forest.
+    predict() walks every tree for a whole batch of rows at once.
+    """
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self.feature = data['feature'].astype(np.intp)
+            self.threshold = data['threshold']
+            self.left = data['left'].astype(np.intp)
+            self.right = data['right'].astype(np.intp)
+            self.value = data['value']
+            self.roots = data['roots'].astype(np.intp)
+            self.max_depth = int(data['max_depth'])
+            self.feature_names = [str(name) for name in data['feature_names']]
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names]
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_trees = len(X), len(self.roots)
+
+        # One current node per (row, tree), flattened; only unfinished walks advance
+        nodes = np.tile(self.roots, n_rows)
+        row_of = np.repeat(np.arange(n_rows), n_trees)
+        active = np.arange(nodes.size)
+        for _ in range(self.max_depth + 1):
+            current = nodes[active]
+            node_feature = self.feature[current]
+            internal = node_feature >= 0 # leaves have feature < 0
+            if not internal.all():
+                active = active[internal]
+                current = current[internal]
+                node_feature = node_feature[internal]
+            if active.size == 0:
+                break
+            go_left = X[row_of[active], node_feature] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+
+        return self.value[nodes].reshape(n_rows, n_trees).mean(axis=1)
+
+def _form_window():
+    """
+    Rolling-form window the stored training features were built with, as recorded
+    in the feature store (config.FORM_WINDOW for stores and pickles that predate it).
+    """
+    window = feature_store.read_meta().get('window') if feature_store.exists() else None
+    return config.FORM_WINDOW if window is None else window
+
+class ModelContext:
+    """
+    Lazily loads the trained artifacts on first access and caches them.
+    Importing this module no longer unpickles anything; paths that never
+    predict (scraping, listing fixtures) never pay for the models.
+    """
+    ARTIFACT_PATHS = {
+        'model_home': MODEL_PATH_HOME,
+        'model_away': MODEL_PATH_AWAY,
+        'encoder': ENCODER_PATH,
+        'elo_state': ELO_PATH,
+        'team_form': TEAM_FORM_PATH,
+        'dixon_coles': DIXON_COLES_PATH,
+    }
+
+    def __init__(self, engine='forest'):
+        self.engine = None
+        self.set_engine(engine)
+        self._artifacts = {}
+        self.load_timings = {} # artifact name -> seconds spent loading
+        self.artifact_hashes = {} # artifact name -> content hash of the file it was loaded from
+        self._lock = threading.Lock()
+
+    # name -> (compiled artifact path, loader); tried before the joblib pickle
+    COMPILED_ARTIFACTS = {
+        'model_home': (FOREST_PATH_HOME, FlatForest),
+        'model_away': (FOREST_PATH_AWAY, FlatForest),
+        'encoder': (ENCODER_CLASSES_PATH, lambda path: TeamCodeLookup(np.load(path, allow_pickle=False))),
+        'dixon_coles': (DIXON_COLES_PATH, DixonColesModel.load),
+    }
+
+    def set_engine(self, engine):
+        """Selects the prediction engine ('forest' or 'dixon_coles')."""
+        if engine not in ENGINE_ARTIFACTS:
+            raise ValueError(f"Unknown prediction engine '{engine}' (choose from {', '.join(ENGINE_ARTIFACTS)})")
+        self.engine = engine
+
+    @property
+    def artifact_names(self):
+        """Artifacts the active engine needs."""
+        return ENGINE_ARTIFACTS[self.engine]
+
+    def _load(self, name):
+        start = time.perf_counter()
+        artifact = None
+        source = None
+        try:
+            path = self.ARTIFACT_PATHS[name]
+            compiled_path, loader = self.COMPILED_ARTIFACTS.get(name, (None, None))
+            if compiled_path and os.path.exists(compiled_path):
+                source = compiled_path
+                artifact = loader(compiled_path)
+            elif os.path.exists(path):
+                source = path
+                artifact = joblib.load(path)
+            elif name == 'team_form' and feature_store.exists():
+                # Older artifacts: build the form index once from the stored history
+                source = feature_store.meta_path()
+                artifact = features.TeamFormIndex.from_matches(feature_store.load(FORM_COLUMNS), window=_form_window())
+            elif name == 'team_form' and os.path.exists(TRAINING_DATA_PATH):
+                source = TRAINING_DATA_PATH
+                artifact = features.TeamFormIndex.from_matches(joblib.load(TRAINING_DATA_PATH), window=_form_window())
+            if artifact is not None:
+                self.artifact_hashes[name] = prediction_cache.file_hash(source)
+        except Exception as e:
+            print(f"Error loading {name}: {e}")
+        self.load_timings[name] = time.perf_counter() - start
+        return artifact
+
+    def get(self, name):
+        """Returns the named artifact, loading it on first use (None if missing)."""
+        if name not in self._artifacts:
+            with self._lock:
+                if name not in self._artifacts:
+                    self._artifacts[name] = self._load(name)
+        return self._artifacts[name]
+
+    @property
+    def model_home(self):
+        return self.get('model_home')
+
+    @property
+    def model_away(self):
+        return self.get('model_away')
+
+    @property
+    def encoder(self):
+        return self.get('encoder')
+
+    @property
+    def elo_state(self):
+        return self.get('elo_state')
+
+    @property
+    def team_form(self):
+        return self.get('team_form')
+
+    @property
+    def dixon_coles(self):
+        return self.get('dixon_coles')
+
+    @property
+    def version(self):
+        """Content hash of the loaded artifacts (changes whenever the model is retrained)."""
+        return prediction_cache.combine_hashes(
+            {name: self.artifact_hashes.get(name) for name in self.artifact_names})
+
+    def is_ready(self):
+        """True if every artifact needed by the active engine is available."""
+        return all(self.get(name) is not None for name in self.artifact_names)
+
+    def warm_up(self):
+        """Loads the active engine's artifacts up front and returns the load timings in seconds."""
+        for name in self.artifact_names:
+            self.get(name)
+        total = sum(self.load_timings.values())
+        print(f"Loaded prediction artifacts in {total:.3f}s: " +
+              ", ".join(f"{k}={v:.3f}s" for k, v in self.load_timings.items()))
+        return dict(self.load_timings)
+
+    def reset(self):
+        """Drops cached artifacts so the next access reloads them from disk."""
+        with self._lock:
+            self._artifacts.clear()
+            self.load_timings.clear()
+            self.artifact_hashes.clear()
+
+context = ModelContext(config.PREDICTION_ENGINE)
+
+def warm_up():
+    """Eagerly loads the prediction artifacts (e.g. before serving many requests)."""
+    return context.warm_up()
+
+def set_engine(engine):
+    """Switches the engine used by predict_matches / expected_goals for this process."""
+    context.set_engine(engine)
+
+# Model predictions keyed on match id + artifact version (random fallbacks are never cached)
+cache = prediction_cache.PredictionCache(config.PREDICTION_CACHE_SIZE, config.PREDICTION_CACHE_PATH or None,
+                                        config.PREDICTION_CACHE_SAVE_INTERVAL, config.PREDICTION_CACHE_SAVE_EVERY)
+# Writes are batched (maybe_save); flush whatever is left when the process exits
+atexit.register(cache.save)
+
+def cache_stats():
+    """Hit / miss statistics of the prediction cache."""
+    return cache.stats()
 
 def get_latest_stats(team_name, df, window=5):
     """Calculates the rolling stats for the team based on historical data."""
-    # Filter matches where team played
-    home_matches = df[df['home_team'] == team_name]
-    away_matches = df[df['away_team'] == team_name]
-    
-    # Combine and sort by date
-    all_matches = pd.concat([home_matches, away_matches]).sort_values(by='date')
-    
-    if all_matches.empty:
+    # Boolean masks over the whole frame (code comparisons when the columns are categorical)
+    is_home = (df['home_team'] == team_name).to_numpy()
+    is_away = (df['away_team'] == team_name).to_numpy()
+    played = np.flatnonzero(is_home | is_away)
+
+    if played.size == 0:
         return 0.0, 0.0 # Default if no history
-        
-    # Get last N matches
-    recent = all_matches.tail(window)
-    
-    goals = []
-    xg = []
-    
-    for _, match in recent.iterrows():
-        if match['home_team'] == team_name:
-            goals.append(match['home_goals'])
-            xg.append(match['home_xg'] if not pd.isna(match.get('home_xg')) else 0.0)
-        else:
-            goals.append(match['away_goals'])
-            xg.append(match['away_xg'] if not pd.isna(match.get('away_xg')) else 0.0)
-            
-    avg_goals = sum(goals) / len(goals) if goals else 0.0
-    avg_xg = sum(xg) / len(xg) if xg else 0.0
-    
-    return avg_goals, avg_xg
+
+    # Last N matches by date
+    dates = df['date'].to_numpy()[played]
+    recent = played[np.argsort(dates, kind='stable')][-window:]
+    home_side = is_home[recent]
+
+    def column(name):
+        if name not in df.columns:
+            return np.zeros(len(recent))
+        return pd.to_numeric(df[name]).to_numpy(dtype=float)[recent]
+
+    def side_values(home_col, away_col):
+        return np.where(home_side, column(home_col), column(away_col))
+
+    goals = side_values('home_goals', 'away_goals')
+    xg = np.nan_to_num(side_values('home_xg', 'away_xg'), nan=0.0)
+    return float(goals.mean()), float(xg.mean())
 
 def poisson_probability(k, lamb):
     """Calculates Poisson probability P(k; lambda)."""
     return (lamb**k * math.exp(-lamb)) / math.factorial(k)
 
-def calculate_probabilities(home_avg, away_avg, max_goals=10):
+def poisson_pmf(lambdas, max_goals=10):
+    """
+    Returns a (n, max_goals + 1) array of Poisson probabilities P(k; lambda)
+    for every lambda, built with a running product instead of factorials.
+    """
+    lambdas = np.asarray(lambdas, dtype=float).reshape(-1)
+    pmf = np.empty((lambdas.size, max_goals + 1))
+    pmf[:, 0] = np.exp(-lambdas)
+    for k in range(1, max_goals + 1):
+        pmf[:, k] = pmf[:, k - 1] * lambdas / k
+    return pmf
+
+def calculate_probabilities(home_avg, away_avg, max_goals=10, rho=0.0):
     """
     Calculates win/draw/loss probabilities based on Poisson distribution.
     Also returns the most likely exact score.
+
+    home_avg / away_avg may be scalars or equal-length arrays of expected goals.
+    Scalars return floats and a (home, away) tuple; arrays return one array
+    per probability and an (n, 2) array of most likely scores.
+    rho applies the Dixon-Coles correction to the 0-0, 1-0, 0-1 and 1-1 scores.
     """
-    prob_home_win = 0.0
-    prob_draw = 0.0
-    prob_away_win = 0.0
-    
-    max_p = -1.0
-    most_likely_score = (0, 0)
-    
-    for h in range(max_goals + 1):
-        for a in range(max_goals + 1):
-            p = poisson_probability(h, home_avg) * poisson_probability(a, away_avg)
-            
-            if p > max_p:
-                max_p = p
-                most_likely_score = (h, a)
-            
-            if h > a:
-                prob_home_win += p
-            elif a > h:
-                prob_away_win += p
-            else:
-                prob_draw += p
-                
+    scalar_input = np.ndim(home_avg) == 0 and np.ndim(away_avg) == 0
+    home_pmf = poisson_pmf(home_avg, max_goals)
+    away_pmf = poisson_pmf(away_avg, max_goals)
+
+    # Joint scoreline matrix per match: rows = home goals, cols = away goals
+    joint = home_pmf[:, :, None] * away_pmf[:, None, :]
+
+    if rho:
+        lam = np.asarray(home_avg, dtype=float).reshape(-1)
+        mu = np.asarray(away_avg, dtype=float).reshape(-1)
+        joint[:, 0, 0] *= np.maximum(1 - lam * mu * rho, 0.0)
+        joint[:, 0, 1] *= np.maximum(1 + lam * rho, 0.0)
+        joint[:, 1, 0] *= np.maximum(1 + mu * rho, 0.0)
+        joint[:, 1, 1] *= max(1 - rho, 0.0)
+
+    prob_home_win = np.tril(joint, -1).sum(axis=(1, 2))
+    prob_away_win = np.triu(joint, 1).sum(axis=(1, 2))
+    prob_draw = np.trace(joint, axis1=1, axis2=2)
+
+    # First maximum in row-major order, same tie-break as the old double loop
+    flat_idx = joint.reshape(len(joint), (max_goals + 1) ** 2).argmax(axis=1)
+    most_likely_score = np.stack(np.divmod(flat_idx, max_goals + 1), axis=1)
+
     # Normalize (since we truncated at max_goals)
     total_prob = prob_home_win + prob_draw + prob_away_win
-    if total_prob > 0:
-        prob_home_win /= total_prob
-        prob_draw /= total_prob
-        prob_away_win /= total_prob
-        
+    total_prob = np.where(total_prob > 0, total_prob, 1.0)
+    prob_home_win = prob_home_win / total_prob
+    prob_draw = prob_draw / total_prob
+    prob_away_win = prob_away_win / total_prob
+
+    if scalar_input:
+        return (float(prob_home_win[0]), float(prob_draw[0]), float(prob_away_win[0]),
+                (int(most_likely_score[0, 0]), int(most_likely_score[0, 1])))
     return prob_home_win, prob_draw, prob_away_win, most_likely_score
 
 def random_prediction(home_team, away_team):
@@ -126,94 +345,173 @@ def random_prediction(home_team, away_team):
         "prob_away": 0.33
     }
 
+def _pick_winner(home_team, away_team, prob_home, prob_draw, prob_away):
+    """Winner based on highest probability, draws win ties with the draw."""
+    if prob_draw >= prob_home and prob_draw >= prob_away:
+        return "Draw"
+    if prob_home > prob_away:
+        return home_team
+    if prob_away > prob_home:
+        return away_team
+    return "Draw"
+
+def _team_features(team):
+    """(team code, elo, rolling goals, rolling xG) of one canonical team name; code -1 if unknown."""
+    try:
+        code = int(context.encoder.transform([team])[0])
+    except Exception:
+        return -1, 0.0, 0.0, 0.0 # Team not found in encoder etc
+    goals, xg = context.team_form.get_form(team)
+    return code, context.elo_state.get_rating(team), goals, xg
+
+def _feature_rows(matches):
+    """
+    Feature rows for the fixtures the models can score; returns (rows_df, positions).
+    Each distinct team is looked up once per batch, then rows are gathered by index.
+    """
+    n = len(matches)
+    names = pd.Series([m['home_team'] for m in matches] + [m['away_team'] for m in matches], dtype=object)
+    codes, uniques = pd.factorize(names)
+    registry = team_registry.get_registry()
+    team_table = np.array([_team_features(registry.canonical(team)) for team in uniques], dtype=np.float64).reshape(-1, 4)
+    home, away = team_table[codes[:n]], team_table[codes[n:]]
+
+    positions = np.flatnonzero((home[:, 0] >= 0) & (away[:, 0] >= 0))
+    home, away = home[positions], away[positions]
+    rows = pd.DataFrame({
+        'home_team_code': home[:, 0].astype(np.int64),
+        'away_team_code': away[:, 0].astype(np.int64),
+        'home_elo': home[:, 1],
+        'away_elo': away[:, 1],
+        'home_rolling_goals': home[:, 2],
+        'away_rolling_goals': away[:, 2],
+        'home_rolling_xg': home[:, 3],
+        'away_rolling_xg': away[:, 3],
+    })
+    return rows, positions.tolist()
+
+def _predict_goals(rows):
+    """Expected (home, away) goals for feature rows, one call to each model."""
+    X_pred = pd.DataFrame(rows)
+    # Ensure non-negative
+    pred_home_goals = np.maximum(0.0, context.model_home.predict(X_pred))
+    pred_away_goals = np.maximum(0.0, context.model_away.predict(X_pred))
+    return pred_home_goals, pred_away_goals
+
+def _model_goals(matches):
+    """
+    Expected goals from the active engine for the fixtures it can score.
+    Returns (home_goals, away_goals, positions, elos) for those fixtures only.
+    """
+    if context.engine == 'dixon_coles':
+        registry = team_registry.get_registry()
+        home = [registry.canonical(m['home_team']) for m in matches]
+        away = [registry.canonical(m['away_team']) for m in matches]
+        home_goals, away_goals = context.dixon_coles.expected_goals(home, away)
+        positions = np.flatnonzero(~np.isnan(home_goals)).tolist()
+        # Elo is only reported alongside the prediction, if a trained state exists
+        elo_state = context.get('elo_state')
+        elos = [(elo_state.get_rating(home[i]), elo_state.get_rating(away[i])) if elo_state else (None, None)
+                for i in positions]
+        return home_goals[positions], away_goals[positions], positions, elos
+
+    rows, positions = _feature_rows(matches)
+    if rows.empty:
+        return np.empty(0), np.empty(0), [], []
+    home_goals, away_goals = _predict_goals(rows)
+    return home_goals, away_goals, positions, list(zip(rows['home_elo'], rows['away_elo']))
+
+def _engine_rho():
+    """Dixon-Coles low-score correction of the active engine (0 for the forests)."""
+    return context.dixon_coles.rho if context.engine == 'dixon_coles' else 0.0
+
+def expected_goals(matches):
+    """
+    Expected goals for a batch of fixtures with a single call to each model.
+    Returns (home_goals, away_goals) float arrays; fixtures the models can't score
+    (unknown team, missing artifacts) are NaN.
+    """
+    home_goals = np.full(len(matches), np.nan)
+    away_goals = np.full(len(matches), np.nan)
+    if not matches or not context.is_ready():
+        return home_goals, away_goals
+
+    try:
+        pred_home_goals, pred_away_goals, positions, _ = _model_goals(matches)
+        home_goals[positions] = pred_home_goals
+        away_goals[positions] = pred_away_goals
+    except Exception as e:
+        print(f"Prediction Error: {e}")
+    return home_goals, away_goals
+
+def predict_matches(matches):
+    """
+    Predicts a batch of fixtures with a single call to each model.
+    matches: list of dicts with keys 'home_team' and 'away_team'
+    Returns a list of prediction dicts in the same order (same shape as predict_match).
+    """
+    results = [None] * len(matches)
+
+    if not context.is_ready():
+        return [random_prediction(m['home_team'], m['away_team']) for m in matches]
+
+    # Repeat fixtures against unchanged artifacts are cache lookups
+    version = context.version
+    keys = [prediction_cache.make_key(version, utils_data.generate_match_id(
+                m.get('date'), m['home_team'], m['away_team'])) for m in matches]
+
+    pending = []
+    for pos in range(len(matches)):
+        results[pos] = cache.get(keys[pos])
+        if results[pos] is None:
+            pending.append(pos)
+
+    if pending:
+        try:
+            pred_home_goals, pred_away_goals, found, elos = _model_goals([matches[pos] for pos in pending])
+            row_positions = [pending[i] for i in found]
+
+            # Nothing scorable (e.g. only unknown teams): leave them to the fallback
+            if row_positions:
+                # Calculate Probabilities for the whole batch at once
+                prob_home, prob_draw, prob_away, likely_scores = calculate_probabilities(
+                    pred_home_goals, pred_away_goals, rho=_engine_rho())
+
+                for i, pos in enumerate(row_positions):
+                    home_team = matches[pos]['home_team']
+                    away_team = matches[pos]['away_team']
+                    ph, pd_, pa = float(prob_home[i]), float(prob_draw[i]), float(prob_away[i])
+
+                    # Use most likely score for display
+                    score_home, score_away = likely_scores[i]
+
+                    results[pos] = {
+                        'winner': _pick_winner(home_team, away_team, ph, pd_, pa),
+                        'score': f"{int(score_home)}-{int(score_away)}",
+                        'home_goals': float(pred_home_goals[i]),
+                        'away_goals': float(pred_away_goals[i]),
+                        'home_elo': None if elos[i][0] is None else int(elos[i][0]),
+                        'away_elo': None if elos[i][1] is None else int(elos[i][1]),
+                        'prob_home': ph,
+                        'prob_draw': pd_,
+                        'prob_away': pa
+                    }
+                    cache.put(keys[pos], results[pos])
+                cache.maybe_save()
+        except Exception as e:
+            # Model failure: these fixtures get the random fallback below
+            print(f"Prediction Error: {e}")
+
+    # Random fallback for anything the models couldn't score
+    for pos, match_data in enumerate(matches):
+        if results[pos] is None:
+            results[pos] = random_prediction(match_data['home_team'], match_data['away_team'])
+
+    return results
+
 def predict_match(match_data):
     """
     Predicts the outcome using AI model if available, else random.
     match_data: dict with keys 'home_team' and 'away_team'
     """
-    home_team = match_data['home_team']
-    away_team = match_data['away_team']
-    
-    if model_home and model_away and encoder and elo_state and training_df is not None:
-        try:
-            # Normalize
-            home_team_norm = utils.normalize_team_name(home_team)
-            away_team_norm = utils.normalize_team_name(away_team)
-
-            # 1. Team Codes
-            home_code = encoder.transform([home_team_norm])[0]
-            away_code = encoder.transform([away_team_norm])[0]
-            
-            # 2. ELO
-            home_elo = elo_state.get_rating(home_team_norm)
-            away_elo = elo_state.get_rating(away_team_norm)
-            
-            # 3. Rolling Stats
-            h_g, h_xg = get_latest_stats(home_team_norm, training_df)
-            a_g, a_xg = get_latest_stats(away_team_norm, training_df)
-            
-            # Construct Feature Vector
-            features_dict = {
-                'home_team_code': home_code,
-                'away_team_code': away_code,
-                'home_elo': home_elo,
-                'away_elo': away_elo,
-                'home_rolling_goals': h_g,
-                'away_rolling_goals': a_g,
-                'home_rolling_xg': h_xg,
-                'away_rolling_xg': a_xg
-            }
-            
-            X_pred = pd.DataFrame([features_dict])
-            
-            pred_home_goals = model_home.predict(X_pred)[0]
-            pred_away_goals = model_away.predict(X_pred)[0]
-            
-            # Ensure non-negative
-            pred_home_goals = max(0.0, pred_home_goals)
-            pred_away_goals = max(0.0, pred_away_goals)
-            
-            # Calculate Probabilities
-            prob_home, prob_draw, prob_away, likely_score = calculate_probabilities(pred_home_goals, pred_away_goals)
-            
-            # Use most likely score for display
-            score_home = likely_score[0]
-            score_away = likely_score[1]
-            
-            # Winner based on highest probability
-            if prob_home > prob_away and prob_home > prob_draw:
-                winner = home_team
-            elif prob_away > prob_home and prob_away > prob_draw:
-                winner = away_team
-            else:
-                 # Check if probabilities are very close or draw is highest
-                if prob_home > prob_away:
-                     winner = home_team # Lean to home if close? No, stick to prob
-                elif prob_away > prob_home:
-                     winner = away_team
-                else:
-                    winner = "Draw"
-            
-            # Override winner if probabilities dictate something else or match expectation logic
-            # Actually, standard is: highest prob wins.
-            if prob_draw >= prob_home and prob_draw >= prob_away:
-                winner = "Draw"
-                
-            return {
-                'winner': winner,
-                'score': f"{int(score_home)}-{int(score_away)}",
-                'home_goals': pred_home_goals,
-                'away_goals': pred_away_goals,
-                'home_elo': int(home_elo),
-                'away_elo': int(away_elo),
-                'prob_home': prob_home,
-                'prob_draw': prob_draw,
-                'prob_away': prob_away
-            }
-            
-        except Exception as e:
-            # Fallback if team not found in encoder etc
-            # print(f"Prediction Error: {e}")
-            return random_prediction(home_team, away_team)
-    else:
-        return random_prediction(home_team, away_team)
+    return predict_matches([match_data])[0]
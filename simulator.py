@@ -0,0 +1,208 @@
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+import team_registry
+
+# Monte Carlo simulation of the rest of a season. Every remaining fixture gets
+# expected goals from the trained models (one batch), then whole seasons are
+# sampled as NumPy arrays: (simulations x fixtures) Poisson scores, turned into
+# (simulations x teams) points / goal difference / goals and ranked.
+
+TOP_N = 4
+RELEGATION_N = 3
+
+def _team_ids(df):
+    """Registry team ids of the home and away sides (match store frames already carry them)."""
+    if 'home_team_id' in df.columns and 'away_team_id' in df.columns:
+        return df['home_team_id'].to_numpy(), df['away_team_id'].to_numpy()
+    registry = team_registry.get_registry()
+    return registry.ids(df['Home']), registry.ids(df['Away'])
+
+def current_standings(completed_df, team_ids):
+    """
+    Points, goal difference, goals for and games played per team from completed matches.
+    team_ids: sorted registry ids of the teams in the table (row order of the result).
+    """
+    home, away = _team_ids(completed_df)
+    h = np.searchsorted(team_ids, home)
+    a = np.searchsorted(team_ids, away)
+    hg = completed_df['HomeGoals'].to_numpy(dtype=np.int64)
+    ag = completed_df['AwayGoals'].to_numpy(dtype=np.int64)
+
+    n = len(team_ids)
+    points = np.zeros(n, dtype=np.int64)
+    np.add.at(points, h, np.where(hg > ag, 3, np.where(hg == ag, 1, 0)))
+    np.add.at(points, a, np.where(ag > hg, 3, np.where(hg == ag, 1, 0)))
+    goal_diff = np.bincount(h, hg - ag, n) + np.bincount(a, ag - hg, n)
+    goals_for = np.bincount(h, hg, n) + np.bincount(a, ag, n)
+    played = np.bincount(h, minlength=n) + np.bincount(a, minlength=n)
+    return points, goal_diff.astype(np.int64), goals_for.astype(np.int64), played
+
+def fixture_expected_goals(upcoming_df, completed_df):
+    """
+    Expected (home, away) goals for every remaining fixture in one predictor batch.
+    Fixtures the models can't score fall back to this season's average home / away goals.
+    """
+    from predictor import expected_goals
+
+    registry = team_registry.get_registry()
+    home, away = (registry.names(ids) for ids in _team_ids(upcoming_df))
+    matches = [{'home_team': h, 'away_team': a} for h, a in zip(home, away)]
+    home_xg, away_xg = expected_goals(matches)
+
+    missing = np.isnan(home_xg) | np.isnan(away_xg)
+    if missing.any():
+        avg_home = completed_df['HomeGoals'].mean() if not completed_df.empty else 1.5
+        avg_away = completed_df['AwayGoals'].mean() if not completed_df.empty else 1.2
+        print(f"No model prediction for {int(missing.sum())} fixtures; using league average goals.")
+        home_xg = np.where(missing, avg_home, home_xg)
+        away_xg = np.where(missing, avg_away, away_xg)
+    return home_xg, away_xg
+
+def _simulate_chunk(task):
+    """
+    Simulates n seasons and returns the (team x position) count matrix
+    and the summed final points per team. Runs in worker processes too.
+    """
+    home_xg, away_xg, home_idx, away_idx, base, n_sims, chunk_size, seed = task
+    rng = np.random.default_rng(seed)
+    n_teams = len(base[0])
+    base_points, base_gd, base_gf = (b.astype(np.float64) for b in base)
+
+    # Fixture -> team incidence matrices, so per-team totals are one matrix product
+    home_onehot = np.zeros((len(home_idx), n_teams), dtype=np.float32)
+    away_onehot = np.zeros((len(away_idx), n_teams), dtype=np.float32)
+    home_onehot[np.arange(len(home_idx)), home_idx] = 1
+    away_onehot[np.arange(len(away_idx)), away_idx] = 1
+
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_sum = np.zeros(n_teams)
+    done = 0
+    while done < n_sims:
+        n = min(chunk_size, n_sims - done)
+        hg = rng.poisson(home_xg, size=(n, len(home_xg))).astype(np.float32)
+        ag = rng.poisson(away_xg, size=(n, len(away_xg))).astype(np.float32)
+
+        home_pts = np.where(hg > ag, 3, np.where(hg == ag, 1, 0)).astype(np.float32)
+        away_pts = np.where(ag > hg, 3, np.where(hg == ag, 1, 0)).astype(np.float32)
+        points = base_points + home_pts @ home_onehot + away_pts @ away_onehot
+        goal_diff = base_gd + (hg - ag) @ home_onehot + (ag - hg) @ away_onehot
+        goals_for = base_gf + hg @ home_onehot + ag @ away_onehot
+
+        # Rank by points, then goal difference, then goals scored; remaining ties at random
+        key = points * 1e6 + (goal_diff + 500) * 1e3 + goals_for + rng.random((n, n_teams))
+        order = np.argsort(-key, axis=1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+        position_counts += np.bincount(
+            (np.arange(n_teams)[None, :] * n_teams + positions).ravel(),
+            minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+        points_sum += points.sum(axis=0)
+        done += n
+    return position_counts, points_sum
+
+def simulate_season(completed_df, upcoming_df, n_sims=100000, workers=1, chunk_size=10000, seed=None):
+    """
+    Simulates the remaining fixtures n_sims times.
+    completed_df / upcoming_df: scraper-style frames (Home, Away, HomeGoals, AwayGoals)
+    of the season being simulated. Returns (table_df, position_probs) where
+    position_probs[i, j] is the probability team i finishes in position j + 1.
+    """
+    home_u, away_u = _team_ids(upcoming_df)
+    team_ids = np.unique(np.concatenate([*_team_ids(completed_df), home_u, away_u]))
+    teams = team_registry.get_registry().names(team_ids)
+
+    points, goal_diff, goals_for, played = current_standings(completed_df, team_ids)
+    home_xg, away_xg = fixture_expected_goals(upcoming_df, completed_df)
+    home_idx = np.searchsorted(team_ids, home_u)
+    away_idx = np.searchsorted(team_ids, away_u)
+    base = (points, goal_diff, goals_for)
+
+    # Independent random streams per worker
+    workers = max(1, min(workers, n_sims))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sims_per_worker = [n_sims // workers + (i < n_sims % workers) for i in range(workers)]
+    tasks = [(home_xg, away_xg, home_idx, away_idx, base, n, chunk_size, s)
+             for n, s in zip(sims_per_worker, seeds)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        outputs = [_simulate_chunk(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_simulate_chunk, tasks))
+    position_counts = sum(out[0] for out in outputs)
+    points_sum = sum(out[1] for out in outputs)
+    print(f"Simulated {n_sims} seasons of {len(home_xg)} remaining fixtures in {time.perf_counter() - start:.2f}s.")
+
+    n_teams = len(teams)
+    position_probs = position_counts / n_sims
+    table = pd.DataFrame({
+        'team': teams,
+        'played': played,
+        'points': points,
+        'goal_diff': goal_diff,
+        'expected_points': points_sum / n_sims,
+        'title': position_probs[:, 0],
+        f'top_{TOP_N}': position_probs[:, :TOP_N].sum(axis=1),
+        'relegation': position_probs[:, max(0, n_teams - RELEGATION_N):].sum(axis=1),
+    })
+    order = table['expected_points'].to_numpy().argsort(kind='stable')[::-1]
+    return table.iloc[order].reset_index(drop=True), position_probs[order]
+
+def load_season(league_id=config.LEAGUE_ID, season=config.SEASON, refresh=False):
+    """Completed and remaining fixtures of one league season from the match store."""
+    import match_store
+    if refresh:
+        match_store.refresh([(league_id, season)])
+    where = "league_id = ? AND season = ? AND home_goals IS {} NULL"
+    completed = match_store.query(where.format("NOT"), (league_id, season))
+    # Remaining fixtures come from the latest scrape only: a rescheduled match gets a
+    # new match id, and its old unplayed row would otherwise be simulated twice
+    latest = "updated_at = (SELECT MAX(updated_at) FROM matches WHERE league_id = ? AND season = ?)"
+    upcoming = match_store.query(f"{where.format('')} AND {latest}", (league_id, season, league_id, season))
+    return completed, upcoming
+
+def run_simulation(league_id=config.LEAGUE_ID, season=config.SEASON, n_sims=100000, workers=1, refresh=False, seed=None):
+    completed, upcoming = load_season(league_id, season, refresh)
+    if completed.empty and upcoming.empty:
+        print(f"No fixtures for league {league_id} season {season} in the match store.")
+        return None, None
+    if upcoming.empty:
+        print("The season is complete; the table is final.")
+
+    table, position_probs = simulate_season(completed, upcoming, n_sims, workers, seed=seed)
+    print(f"\nSeason projection ({n_sims} simulations):")
+    print(f"{'Team':<26}{'Pts':>5}{'xPts':>8}{'Title':>8}{'Top ' + str(TOP_N):>8}{'Releg.':>8}")
+    for row in table.itertuples(index=False):
+        print(f"{row.team:<26}{row.points:>5}{row.expected_points:>8.1f}"
+              f"{row.title * 100:>7.1f}%{getattr(row, f'top_{TOP_N}') * 100:>7.1f}%{row.relegation * 100:>7.1f}%")
+    return table, position_probs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of the rest of the season")
+    parser.add_argument('--league', type=int, default=config.LEAGUE_ID)
+    parser.add_argument('--season', type=int, default=config.SEASON)
+    parser.add_argument('--sims', type=int, default=100000, help="Number of simulated seasons")
+    parser.add_argument('--workers', type=int, default=1, help="Processes to split the simulations over")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--refresh', action='store_true', help="Refresh the match store from FBref first")
+    parser.add_argument('--output', default=None, help="Optional path to write the projection as JSON")
+    args = parser.parse_args()
+
+    table, position_probs = run_simulation(args.league, args.season, args.sims, args.workers, args.refresh, args.seed)
+    if table is not None and args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'league_id': args.league,
+                'season': args.season,
+                'simulations': args.sims,
+                'table': table.to_dict(orient='records'),
+                'positions': {team: probs.round(6).tolist() for team, probs in zip(table['team'], position_probs)},
+            }, f, indent=4)
+        print(f"Saved projection to {args.output}")
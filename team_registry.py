@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import utils
+import utils_data
+
+# Canonical team identities. Every team gets a stable integer id the first time
+# it is seen (ids are never reused or renumbered), and every known alias maps to
+# its canonical name. Columns are mapped once per distinct value, so a frame with
+# 100k rows and 40 teams costs 40 dict lookups, and team columns come out as
+# categoricals whose codes ARE the team ids.
+REGISTRY_PATH = os.path.join("data", "team_registry.json")
+
+# Team name column -> id column added next to it
+TEAM_COLUMNS = {'home_team': 'home_team_id', 'away_team': 'away_team_id'}
+
+class TeamRegistry:
+    def __init__(self, teams=(), aliases=None, path=None):
+        self.path = path
+        self.teams = [str(team) for team in teams] # id -> canonical name
+        self._ids = {team: i for i, team in enumerate(self.teams)}
+        self.aliases = dict(utils.TEAM_ALIASES)
+        self.aliases.update(aliases or {})
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.teams)
+
+    def canonical(self, name):
+        """Canonical spelling of a team name."""
+        return self.aliases.get(name, name)
+
+    def add_alias(self, alias, name):
+        """Maps another spelling to a canonical name (registering the name if needed)."""
+        name = self.canonical(name)
+        self.team_id(name)
+        if self.aliases.get(alias) != name:
+            self.aliases[alias] = name
+            self._dirty = True
+
+    def team_id(self, name, register=True):
+        """Id of one team (-1 if unknown and register is False)."""
+        name = self.canonical(name)
+        idx = self._ids.get(name)
+        if idx is None:
+            if not register:
+                return -1
+            with self._lock:
+                idx = self._ids.get(name)
+                if idx is None:
+                    idx = len(self.teams)
+                    self.teams.append(name)
+                    self._ids[name] = idx
+                    self._dirty = True
+        return idx
+
+    def ids(self, names, register=True):
+        """
+        int32 ids for a column / list of team names, mapping each distinct value once.
+        Missing names (and unknown ones when register is False) are -1.
+        """
+        if not isinstance(names, pd.Series):
+            names = pd.Series(list(names), dtype=object)
+        codes, uniques = pd.factorize(names)
+        # Trailing -1 is where factorize's "missing" code (-1) lands
+        lookup = np.array([self.team_id(name, register) for name in uniques] + [-1], dtype=np.int32)
+        return lookup[codes]
+
+    def categorical(self, ids):
+        """Categorical of canonical names from team ids; the codes equal the ids."""
+        return pd.Categorical.from_codes(np.asarray(ids), categories=pd.Index(self.teams, dtype=object))
+
+    def encode(self, df, columns=TEAM_COLUMNS, register=True):
+        """
+        Canonicalizes team columns in place as categoricals and adds their int32
+        id columns ({name column: id column}). Re-encoding a frame is cheap.
+        """
+        for col, id_col in columns.items():
+            ids = self.ids(df[col], register)
+            df[id_col] = ids
+            df[col] = self.categorical(ids)
+        return df
+
+    def names(self, ids):
+        """Canonical names for an array of ids (None for -1)."""
+        ids = np.asarray(ids)
+        return np.where(ids >= 0, np.asarray(self.teams + [None], dtype=object)[ids], None)
+
+    def to_dict(self):
+        return {'teams': self.teams, 'aliases': self.aliases}
+
+    def save(self, path=None):
+        """Writes the registry if new teams or aliases were added."""
+        path = path or self.path
+        if not path or not self._dirty:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            payload = json.dumps(self.to_dict(), indent=1)
+            self._dirty = False
+        utils_data.write_atomic(path, payload)
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        """Reads the registry file, or starts an empty registry if there is none."""
+        data = utils_data.load_json(path) if os.path.exists(path) else None
+        data = data or {}
+        return cls(data.get('teams', []), data.get('aliases'), path)
+
+class TeamCodeLookup:
+    """
+    Drop-in for a fitted LabelEncoder's transform(), built from its saved classes.
+    classes_[i] is the name encoded as i; empty names are unused codes (team ids
+    the models were not trained on).
+    """
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._codes = {name: i for i, name in enumerate(self.classes_.tolist()) if name}
+
+    def transform(self, values):
+        try:
+            return np.array([self._codes[v] for v in values], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e}")
+
+    @classmethod
+    def from_ids(cls, registry, ids):
+        """Lookup whose codes are registry ids, limited to the given teams."""
+        classes = np.full(len(registry), "", dtype=object)
+        ids = np.unique(np.asarray(ids))
+        ids = ids[ids >= 0]
+        classes[ids] = registry.names(ids)
+        return cls(classes.astype(str))
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry(path=REGISTRY_PATH):
+    """The process-wide registry, loaded from disk on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None or _registry.path != path:
+            _registry = TeamRegistry.load(path)
+        return _registry
+
+def encode(df, columns=TEAM_COLUMNS, save=True):
+    """Encodes team columns with the shared registry and persists any new teams."""
+    registry = get_registry()
+    registry.encode(df, columns)
+    if save:
+        registry.save()
+    return df
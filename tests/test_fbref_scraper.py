@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import fbref_scraper
+
+ETAG = '"sched-v1"'
+LAST_MODIFIED = "Sat, 17 Oct 2026 12:00:00 GMT"
+
+SCHEDULE_HTML = (
+    '<html><body><table id="sched_2026-2027_9_1"><thead><tr>'
+    '<th>Wk</th><th>Date</th><th>Home</th><th>xG</th><th>Score</th><th>xG</th><th>Away</th>'
+    '</tr></thead><tbody>'
+    '<tr><th>1</th><td>2026-08-15</td><td>Arsenal</td><td>1.8</td><td>2&ndash;1</td><td>0.9</td><td>Chelsea</td></tr>'
+    '<tr><th>1</th><td>2026-08-22</td><td>Liverpool</td><td></td><td></td><td></td><td>Everton</td></tr>'
+    '</tbody></table></body></html>'
+).encode('utf-8')
+
+class ScheduleHandler(BaseHTTPRequestHandler):
+    """Stand-in for FBref: serves one schedule page with validators and honours them."""
+    requests_seen = []
+
+    def do_GET(self):
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        if headers.get('if-none-match') == ETAG or headers.get('if-modified-since') == LAST_MODIFIED:
+            status = 304
+        else:
+            status = 200
+        self.requests_seen.append((headers, status))
+
+        self.send_response(status)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        if status == 200:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(SCHEDULE_HTML)))
+            self.end_headers()
+            self.wfile.write(SCHEDULE_HTML)
+        else:
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def schedule_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(fbref_scraper, "CACHE_DIR", str(tmp_path / "cache"))
+    # Every fetch revalidates, and the politeness delay is skipped
+    monkeypatch.setattr(config, "SCRAPE_CACHE_TTL", 0)
+    monkeypatch.setattr(fbref_scraper, "rate_limiter", fbref_scraper.RateLimiter(0, jitter=0))
+    ScheduleHandler.requests_seen = []
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScheduleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/en/comps/9/schedule/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_second_fetch_revalidates_and_reuses_cached_frame(schedule_url, monkeypatch):
+    first = fbref_scraper.fetch_schedule(schedule_url)
+    assert len(first) == 2
+    assert first.loc[0, 'HomeGoals'] == 2 and first.loc[0, 'home_xg'] == pytest.approx(1.8)
+
+    headers, status = ScheduleHandler.requests_seen[0]
+    assert status == 200
+    assert 'if-none-match' not in headers and 'if-modified-since' not in headers
+
+    parses = []
+    monkeypatch.setattr(fbref_scraper, "parse_schedule", lambda html: parses.append(html))
+    second = fbref_scraper.fetch_schedule(schedule_url)
+
+    assert len(ScheduleHandler.requests_seen) == 2
+    headers, status = ScheduleHandler.requests_seen[1]
+    assert headers['if-none-match'] == ETAG
+    assert headers['if-modified-since'] == LAST_MODIFIED
+    assert status == 304
+    assert parses == []
+    pd.testing.assert_frame_equal(second, first)
+
+def test_fresh_cache_skips_the_request(schedule_url, monkeypatch):
+    first = fbref_scraper.fetch_schedule(schedule_url)
+    monkeypatch.setattr(config, "SCRAPE_CACHE_TTL", 3600)
+    second = fbref_scraper.fetch_schedule(schedule_url)
+
+    assert len(ScheduleHandler.requests_seen) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+def test_cache_meta_names_the_frame_it_describes(tmp_path, monkeypatch):
+    monkeypatch.setattr(fbref_scraper, "CACHE_DIR", str(tmp_path))
+    url = "http://127.0.0.1/en/comps/9/schedule/"
+    old = pd.DataFrame({'Home': ['Arsenal'], 'Away': ['Chelsea']})
+    new = pd.DataFrame({'Home': ['Liverpool'], 'Away': ['Everton']})
+
+    fbref_scraper._save_cache(url, {'url': url, 'etag': '"v1"'}, old)
+    fbref_scraper._save_cache(url, {'url': url, 'etag': '"v2"'}, new)
+
+    meta, df = fbref_scraper._load_cache(url)
+    assert meta['etag'] == '"v2"'
+    pd.testing.assert_frame_equal(df, new)
+    # The superseded frame is cleaned up; no temp files are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(fbref_scraper._meta_path(url)), meta['frame']])
@@ -1,29 +1,72 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
 import joblib
+import numpy as np
 import config
-import utils
+import utils_data
 import features
+import dixon_coles
+import team_registry
+import feature_store
 # import api_client - REMOVED
 # from match_manager import filter_and_sort_matches - REMOVED
 
-def train():
-    print("Fetching training data from Scraper...")
-    from fbref_scraper import scrape_data
-    
-    # Fetch all fixtures (scraper returns completed and upcoming)
-    completed_matches, _ = scrape_data()
-    
-    if completed_matches.empty:
-        print("No completed matches found to train on.")
-        return
+MODEL_PATH_HOME = 'model_home.pkl'
+MODEL_PATH_AWAY = 'model_away.pkl'
+ENCODER_PATH = 'team_encoder.pkl'
+ELO_PATH = 'elo_state.pkl'
+TEAM_FORM_PATH = 'team_form.pkl'
+# Compiled artifacts for predict time: flattened forests and the encoder's classes
+FOREST_PATH_HOME = 'forest_home.npz'
+FOREST_PATH_AWAY = 'forest_away.npz'
+ENCODER_CLASSES_PATH = 'team_encoder_classes.npy'
+# Dixon-Coles engine parameters (PREDICTION_ENGINE=dixon_coles)
+DIXON_COLES_PATH = 'dixon_coles.json'
+# Bookkeeping for incremental runs: last ingested match date, last fit time, etc.
+TRAIN_STATE_PATH = 'train_state.pkl'
 
-    print(f"Training on {len(completed_matches)} matches.")
-    
-    # Prepare DataFrame for training
+# Best configuration found by `--tune`, read by every later training run
+BEST_PARAMS_PATH = 'best_params.json'
+
+# Forest and feature-window settings used when no tuning result exists
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': None,
+    'min_samples_leaf': 1,
+    'window': config.FORM_WINDOW,
+}
+
+# Search space for `--tune` (full grid unless --n-iter samples from it)
+PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [None, 8, 16],
+    'min_samples_leaf': [1, 3, 5],
+    'window': [3, 5, 8],
+}
+
+# Feature Columns
+# We now use ELO and Form instead of just Team Codes!
+# But we might keep Team Codes as well as categorical embedding proxy
+FEATURE_COLS = [
+    'home_team_code', 'away_team_code',
+    'home_elo', 'away_elo',
+    'home_rolling_goals', 'away_rolling_goals',
+    'home_rolling_xg', 'away_rolling_xg'
+]
+
+def prepare_matches(completed_matches):
+    """Renames scraper columns and normalizes team names for training."""
     df = completed_matches.copy()
-    
+
     df = df.rename(columns={
         'Home': 'home_team',
         'Away': 'away_team',
@@ -31,71 +74,363 @@ def train():
         'AwayGoals': 'away_goals',
         'Date': 'date'
     })
-    
+
     # Ensure goals are numeric
     df['home_goals'] = pd.to_numeric(df['home_goals'])
     df['away_goals'] = pd.to_numeric(df['away_goals'])
 
-    # Normalize Team Names
-    df['home_team'] = df['home_team'].apply(utils.normalize_team_name)
-    df['away_team'] = df['away_team'].apply(utils.normalize_team_name)
+    # Canonical team names as categoricals plus stable integer team ids
+    return team_registry.encode(df)
 
-    # --- Feature Engineering ---
-    print("Engineering features (ELO, Form, xG)...")
-    
-    # 1. ELO Ratings
-    df, elo_rater = features.add_elo_ratings(df)
-    
-    # 2. Rolling Stats
-    df = features.calculate_rolling_stats(df)
-    
-    # Features and Targets
-    # We now use ELO and Form instead of just Team Codes!
-    # But we might keep Team Codes as well as categorical embedding proxy
-    
-    # Encode Team Names (Still useful for ID-based trends)
-    le = LabelEncoder()
-    all_teams = pd.concat([df['home_team'], df['away_team']]).unique()
-    le.fit(all_teams)
-    
-    df['home_team_code'] = le.transform(df['home_team'])
-    df['away_team_code'] = le.transform(df['away_team'])
-    
-    # Feature Columns
-    feature_cols = [
-        'home_team_code', 'away_team_code',
-        'home_elo', 'away_elo',
-        'home_rolling_goals', 'away_rolling_goals',
-        'home_rolling_xg', 'away_rolling_xg'
-    ]
-    
-    X = df[feature_cols]
+def load_best_params():
+    """Returns the tuned parameters from BEST_PARAMS_PATH, or the defaults."""
+    params = dict(DEFAULT_PARAMS)
+    if os.path.exists(BEST_PARAMS_PATH):
+        with open(BEST_PARAMS_PATH, 'r', encoding='utf-8') as f:
+            params.update(json.load(f).get('params', {}))
+    return params
+
+def add_team_codes(df):
+    """
+    Adds home/away_team_code columns (registry team ids) and returns the matching
+    encoder for predict time, which only knows the teams present in df.
+    """
+    if 'home_team_id' not in df.columns or 'away_team_id' not in df.columns:
+        team_registry.encode(df)
+    df['home_team_code'] = df['home_team_id']
+    df['away_team_code'] = df['away_team_id']
+    return team_registry.TeamCodeLookup.from_ids(
+        team_registry.get_registry(), np.concatenate([df['home_team_id'], df['away_team_id']]))
+
+def fit_models(df, params=None):
+    """Fits the team encoder and both forests on the engineered frame and saves them."""
+    if params is None:
+        params = load_best_params()
+
+    # Team codes are the registry's stable team ids (still useful for ID-based trends)
+    encoder = add_team_codes(df)
+
+    X = df[FEATURE_COLS]
     y_home = df['home_goals']
     y_away = df['away_goals']
-    
+
     # Train Model (Random Forest)
     print("Training Random Forest with Advanced Features...")
-    model_home = RandomForestRegressor(n_estimators=100, random_state=42)
-    model_away = RandomForestRegressor(n_estimators=100, random_state=42)
-    
+    forest_params = dict(
+        n_estimators=params['n_estimators'],
+        max_depth=params['max_depth'],
+        min_samples_leaf=params['min_samples_leaf'],
+        random_state=42,
+        n_jobs=-1,
+    )
+    model_home = RandomForestRegressor(**forest_params)
+    model_away = RandomForestRegressor(**forest_params)
+
     model_home.fit(X, y_home)
     model_away.fit(X, y_away)
-    
+
     print("Model training complete.")
-    
+
     # Save artifacts
-    joblib.dump(model_home, 'model_home.pkl')
-    joblib.dump(model_away, 'model_away.pkl')
-    joblib.dump(le, 'team_encoder.pkl')
-    
+    joblib.dump(model_home, MODEL_PATH_HOME)
+    joblib.dump(model_away, MODEL_PATH_AWAY)
+    joblib.dump(encoder, ENCODER_PATH)
+
+    # Compiled copies so predicting never needs sklearn or the full pickles
+    export_forest(model_home, FOREST_PATH_HOME)
+    export_forest(model_away, FOREST_PATH_AWAY)
+    np.save(ENCODER_CLASSES_PATH, encoder.classes_)
+    return df
+
+def export_forest(model, path, feature_names=FEATURE_COLS):
+    """
+    Flattens a fitted RandomForestRegressor into compact NumPy node arrays
+    (one concatenated array per field, child indices made global) and saves
+    them to an .npz file for predictor.FlatForest.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    def children(tree, offset, side):
+        # -1 marks "no child" (leaf); shift real children into the global index space
+        return np.where(side >= 0, side + offset, -1)
+
+    np.savez(
+        path,
+        feature=np.concatenate([tree.feature for tree in trees]).astype(np.int16),
+        threshold=np.concatenate([tree.threshold for tree in trees]),
+        left=np.concatenate([children(t, o, t.children_left) for t, o in zip(trees, offsets)]).astype(np.int32),
+        right=np.concatenate([children(t, o, t.children_right) for t, o in zip(trees, offsets)]).astype(np.int32),
+        value=np.concatenate([tree.value[:, 0, 0] for tree in trees]),
+        roots=offsets.astype(np.int32),
+        max_depth=max(tree.max_depth for tree in trees),
+        feature_names=np.array(feature_names),
+    )
+
+def fit_dixon_coles(df):
+    """Fits the Dixon-Coles engine on the whole match history and saves it."""
+    start = time.perf_counter()
+    model = dixon_coles.fit(df, xi=config.DIXON_COLES_XI)
+    model.save(DIXON_COLES_PATH)
+    print(f"Dixon-Coles model fitted on {len(df)} matches in {time.perf_counter() - start:.2f}s "
+          f"(home advantage {model.home_advantage:.3f}, rho {model.rho:.3f}).")
+    return model
+
+def save_feature_state(df, elo_rater, team_form, fitted, previous_state=None):
+    """Saves the Elo/form state, the training frame and the incremental bookkeeping."""
     # Save Feature Engineering State (Current ELOs, Last Match Stats)
-    # We need to save the 'elo_rater' and the raw 'df' (to calculate latest rolling stats)
-    joblib.dump(elo_rater, 'elo_state.pkl')
-    # Save just the minimal needed for rolling stats (last 5 games per team)
-    # Actually, saving the whole training DF is easiest for now to recalculate 'current' form
-    joblib.dump(df, 'training_data.pkl') 
-    
+    joblib.dump(elo_rater, ELO_PATH)
+    # Compact per-team form index (last 5 goals / xG) used for O(1) lookups at predict time
+    joblib.dump(team_form, TEAM_FORM_PATH)
+    # The training history is still needed to refit the forests; only the
+    # columns that refits and incremental runs use are kept (feature_store)
+    feature_store.save(df, window=team_form.window)
+
+    state = dict(previous_state or {})
+    state['last_match_date'] = df['date'].max()
+    state['n_matches'] = len(df)
+    if fitted:
+        state['last_fit_at'] = datetime.now(timezone.utc)
+        state['matches_at_fit'] = len(df)
+    joblib.dump(state, TRAIN_STATE_PATH)
+
+def stored_window():
+    """Rolling-form window of the saved training state (None if unknown)."""
+    if feature_store.exists():
+        return feature_store.read_meta().get('window')
+    return None
+
+def load_training_matches():
+    """Refreshes the match store and returns every completed match, prepared for training."""
+    print("Fetching training data from Scraper...")
+    import match_store
+
+    # Refresh the match store and read every completed match it holds
+    completed_matches, _ = match_store.load_fixtures()
+
+    if completed_matches.empty:
+        print("No completed matches found to train on.")
+        return None
+
+    # Prepare DataFrame for training
+    return prepare_matches(completed_matches)
+
+def train(incremental=False, refit='auto'):
+    """
+    Trains the models.
+    incremental: only ingest matches newer than the last run, resuming the saved
+                 Elo and form state (falls back to a full run if state is missing).
+    refit: 'auto' (staleness policy from config), 'always' or 'never'.
+    """
+    df = load_training_matches()
+    if df is None:
+        return
+
+    if incremental:
+        state_paths = [ELO_PATH, TEAM_FORM_PATH, TRAIN_STATE_PATH]
+        window = load_best_params()['window']
+        if not (all(os.path.exists(p) for p in state_paths) and feature_store.exists()):
+            print("No saved training state found. Running full training instead.")
+        elif stored_window() != window:
+            # Stored rolling features and the form index use another window (e.g. after --tune)
+            print(f"Saved rolling features use window {stored_window()}, tuned window is {window}. "
+                  "Running full training instead.")
+        else:
+            return train_incremental(df, refit)
+
+    print(f"Training on {len(df)} matches.")
+
+    # --- Feature Engineering ---
+    print("Engineering features (ELO, Form, xG)...")
+
+    # 1. ELO Ratings
+    df, elo_rater = features.add_elo_ratings(df)
+
+    # 2. Rolling Stats
+    params = load_best_params()
+    df = features.calculate_rolling_stats(df, window=params['window'])
+
+    fitted = refit != 'never'
+    if fitted:
+        df = fit_models(df, params)
+        fit_dixon_coles(df)
+    else:
+        print("Skipping model fit (refit=never).")
+
+    team_form = features.TeamFormIndex.from_matches(df, window=params['window'])
+    save_feature_state(df, elo_rater, team_form, fitted)
+
     print("Models and Feature States saved to disk.")
 
+def train_incremental(df, refit='auto'):
+    """Ingests only matches not seen before, updating Elo and form in O(new matches)."""
+    elo_rater = joblib.load(ELO_PATH)
+    team_form = joblib.load(TEAM_FORM_PATH)
+    training_df = feature_store.load()
+    state = joblib.load(TRAIN_STATE_PATH)
+
+    last_date = state['last_match_date']
+    # Results normally arrive in date order, but a late-reported match can be
+    # older than the last trained date, so new rows are picked by match id.
+    known_ids = set(
+        utils_data.generate_match_id(d, h, a)
+        for d, h, a in training_df[['date', 'home_team', 'away_team']].itertuples(index=False)
+    )
+    is_new = [
+        utils_data.generate_match_id(d, h, a) not in known_ids
+        for d, h, a in df[['date', 'home_team', 'away_team']].itertuples(index=False)
+    ]
+    new_df = df[is_new]
+
+    if new_df.empty:
+        print(f"No new matches since {last_date.date()}. Training state is up to date.")
+        return
+
+    print(f"Ingesting {len(new_df)} new matches since {last_date.date()}...")
+
+    # Resume Elo and form from the saved state; only the new rows are processed
+    new_df, elo_rater = features.add_elo_ratings(new_df.copy(), elo_rater)
+    new_df = team_form.ingest(new_df)
+
+    training_df = pd.concat([training_df, new_df], ignore_index=True)
+    # New teams widen the categories; re-encode so both columns share them again
+    training_df = team_registry.encode(training_df)
+
+    # Decide whether the forests need refitting
+    encoder = joblib.load(ENCODER_PATH) if os.path.exists(ENCODER_PATH) else None
+    new_teams = set(new_df['home_team'].astype(str)) | set(new_df['away_team'].astype(str))
+    unseen_teams = encoder is None or not new_teams.issubset(set(encoder.classes_))
+
+    new_since_fit = len(training_df) - state.get('matches_at_fit', 0)
+    last_fit_at = state.get('last_fit_at')
+    fit_age_days = (datetime.now(timezone.utc) - last_fit_at).days if last_fit_at else None
+
+    if refit == 'always':
+        fitted = True
+    elif refit == 'never':
+        fitted = False
+    else:
+        fitted = (unseen_teams
+                  or new_since_fit >= config.REFIT_MIN_NEW_MATCHES
+                  or fit_age_days is None
+                  or fit_age_days >= config.REFIT_MAX_AGE_DAYS)
+
+    if fitted:
+        print(f"Refitting models ({new_since_fit} matches since last fit).")
+        training_df = fit_models(training_df)
+    else:
+        if unseen_teams:
+            print("Warning: new teams stay unknown to the models until the next refit.")
+        print(f"Keeping current models ({new_since_fit} matches since last fit).")
+
+    # Dixon-Coles is cheap enough to refit on every new batch of results
+    if refit != 'never':
+        fit_dixon_coles(training_df)
+
+    save_feature_state(training_df, elo_rater, team_form, fitted, previous_state=state)
+    print("Feature States updated on disk.")
+
+def _evaluate_params(task):
+    """
+    Process-pool worker: time-ordered CV score of one configuration.
+    The feature matrix is opened read-only via memory mapping, never pickled.
+    """
+    params, matrix_path, target_path, n_splits = task
+    from sklearn.metrics import mean_poisson_deviance
+    from sklearn.model_selection import TimeSeriesSplit
+
+    X = np.load(matrix_path, mmap_mode='r')
+    y = np.load(target_path, mmap_mode='r')
+
+    scores = []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        fold_score = 0.0
+        for target in range(2): # home goals, away goals
+            model = RandomForestRegressor(
+                n_estimators=params['n_estimators'],
+                max_depth=params['max_depth'],
+                min_samples_leaf=params['min_samples_leaf'],
+                random_state=42,
+                n_jobs=1,
+            )
+            model.fit(X[train_idx], y[train_idx, target])
+            pred = np.clip(model.predict(X[test_idx]), 1e-6, None)
+            fold_score += mean_poisson_deviance(y[test_idx, target], pred)
+        scores.append(fold_score / 2)
+    return params, float(np.mean(scores))
+
+def tune(n_splits=5, n_iter=None, max_workers=None, seed=42):
+    """
+    Searches PARAM_GRID with time-ordered cross-validation (each fold trains on
+    the past and scores the following matches by Poisson deviance) across a
+    process pool, then writes the best configuration to BEST_PARAMS_PATH.
+    """
+    df = load_training_matches()
+    if df is None:
+        return None
+
+    df, _ = features.add_elo_ratings(df)
+    add_team_codes(df)
+    targets = df[['home_goals', 'away_goals']].to_numpy(dtype=np.float64)
+
+    keys = list(PARAM_GRID)
+    candidates = [dict(zip(keys, values)) for values in itertools.product(*PARAM_GRID.values())]
+    if n_iter is not None and n_iter < len(candidates):
+        candidates = random.Random(seed).sample(candidates, n_iter)
+
+    print(f"Tuning {len(candidates)} configurations with {n_splits}-fold time-ordered CV on {len(df)} matches...")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="tune_") as tmp_dir:
+        # One feature matrix per window, written once and memory-mapped by every worker
+        target_path = os.path.join(tmp_dir, "targets.npy")
+        np.save(target_path, targets)
+        matrix_paths = {}
+        for window in sorted({c['window'] for c in candidates}):
+            windowed = features.calculate_rolling_stats(df.copy(), window=window)
+            matrix_paths[window] = os.path.join(tmp_dir, f"features_w{window}.npy")
+            np.save(matrix_paths[window], windowed[FEATURE_COLS].to_numpy(dtype=np.float64))
+
+        tasks = [(c, matrix_paths[c['window']], target_path, n_splits) for c in candidates]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for params, score in pool.map(_evaluate_params, tasks):
+                results.append({'params': params, 'score': score})
+                print(f"  {params} -> {score:.4f}")
+
+    results.sort(key=lambda r: r['score'])
+    best = results[0]
+    with open(BEST_PARAMS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({
+            'params': best['params'],
+            'score': best['score'],
+            'metric': 'mean_poisson_deviance',
+            'cv_splits': n_splits,
+            'n_matches': len(df),
+            'tuned_at': datetime.now(timezone.utc).isoformat(),
+            'top_results': results[:5],
+        }, f, indent=4)
+
+    print(f"Best configuration: {best['params']} (deviance {best['score']:.4f}). Saved to {BEST_PARAMS_PATH}.")
+    return best
+
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train the Football Predictor models")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only ingest matches newer than the last training run")
+    parser.add_argument('--refit', choices=['auto', 'always', 'never'], default='auto',
+                        help="When to refit the forests (default: staleness policy in config.py)")
+    parser.add_argument('--tune', action='store_true',
+                        help="Search forest / feature-window parameters instead of training")
+    parser.add_argument('--n-iter', type=int, default=None,
+                        help="With --tune: sample this many configurations instead of the full grid")
+    parser.add_argument('--cv-splits', type=int, default=5,
+                        help="With --tune: number of time-ordered CV folds")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="With --tune: worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.tune:
+        tune(n_splits=args.cv_splits, n_iter=args.n_iter, max_workers=args.workers)
+    else:
+        train(incremental=args.incremental, refit=args.refit)
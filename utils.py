@@ -23,22 +23,25 @@ def is_same_day(date1, date2):
     """Checks if two datetime objects represent the same calendar day."""
     return date1.date() == date2.date()
 
+# FBRef/Scraper team names -> API-Football names (generally shorter / standard)
+TEAM_ALIASES = {
+    "Manchester Utd": "Manchester United",
+    "Newcastle Utd": "Newcastle",
+    "Nott'ham Forest": "Nottingham Forest",
+    "Wolverhampton Wanderers": "Wolves",
+    "West Ham United": "West Ham",
+    "Brighton & Hove Albion": "Brighton",
+    "Tottenham Hotspur": "Tottenham",
+    "Luton Town": "Luton",
+    "Leeds United": "Leeds",
+    "Leicester City": "Leicester",
+    "Norwich City": "Norwich"
+}
+
 def normalize_team_name(name):
     """
     Normalizes team names from FBRef/Scraper to match API-Football names.
-    API-Football names are generally shorter / standard.
+    Only knows the built-in aliases; the app canonicalizes through
+    team_registry, which also applies aliases saved with add_alias.
     """
-    mapping = {
-        "Manchester Utd": "Manchester United",
-        "Newcastle Utd": "Newcastle",
-        "Nott'ham Forest": "Nottingham Forest",
-        "Wolverhampton Wanderers": "Wolves",
-        "West Ham United": "West Ham",
-        "Brighton & Hove Albion": "Brighton",
-        "Tottenham Hotspur": "Tottenham",
-        "Luton Town": "Luton",
-        "Leeds United": "Leeds",
-        "Leicester City": "Leicester",
-        "Norwich City": "Norwich"
-    }
-    return mapping.get(name, name)
+    return TEAM_ALIASES.get(name, name)
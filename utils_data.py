@@ -1,6 +1,7 @@
 import os
 import json
 import hashlib
+import tempfile
 from datetime import datetime
 import pandas as pd
 
@@ -41,11 +42,29 @@ def get_result_file_path(date_str=None):
         date_str = datetime.utcnow().strftime('%Y-%m-%d')
     return os.path.join(RESULTS_DIR, f"{date_str}.json")
 
+def write_atomic(path, text):
+    """
+    Writes text (or bytes) to path via a temp file and rename, so readers never
+    see a partial file.
+    """
+    # A unique temp file per write, so concurrent writers never clobber each other's
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        binary = isinstance(text, bytes)
+        with os.fdopen(fd, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def save_json(data, path):
     """Saves data to a JSON file."""
     try:
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        write_atomic(path, json.dumps(data, indent=4))
         print(f"Saved data to {path}")
     except Exception as e:
         print(f"Error saving JSON to {path}: {e}")